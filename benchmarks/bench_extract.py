@@ -0,0 +1,48 @@
+"""
+Benchmark: wall-clock tijd van ExtractPool.extract_many tegen het aantal workers.
+Gebruikt een nep-extractor met vaste latency, dus er is geen netwerk nodig.
+
+Gebruik:
+    python benchmarks/bench_extract.py --tracks 500 --latency 0.05 --workers 1 2 4 8 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.extract_pool import ExtractPool  # noqa: E402
+# Gedeelde nep-onderdelen uit tests/.
+from tests.fake_youtube_dl import FakeYoutubeDL  # noqa: E402
+
+
+async def run(tracks, workers):
+    pool = ExtractPool({}, max_workers=workers, ydl_factory=FakeYoutubeDL)
+    queries = [f"https://www.youtube.com/watch?v=vid{i:08d}" for i in range(tracks)]
+    start = time.perf_counter()
+    results = await pool.extract_many(queries)
+    elapsed = time.perf_counter() - start
+    pool.close()
+    assert [r.query for r in results] == queries
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    FakeYoutubeDL.latency = args.latency
+    print(f"{args.tracks} tracks, {args.latency * 1000:.0f} ms per extractie")
+    print(f"{'workers':>8} {'tijd (s)':>10} {'tracks/s':>10}")
+    for workers in args.workers:
+        elapsed = asyncio.run(run(args.tracks, workers))
+        print(f"{workers:>8} {elapsed:>10.2f} {args.tracks / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
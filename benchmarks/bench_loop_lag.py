@@ -0,0 +1,92 @@
+"""
+Benchmark: vertraging van de event loop tijdens een import van 200 nummers,
+met de thread-pool tegenover de process-pool als extractie-backend.
+
+De nep-extractor simuleert yt-dlp: een stukje netwerkwachttijd (zonder GIL)
+gevolgd door pure-Python parsen (met GIL). Een monitor-taak slaapt steeds 10 ms
+en meet hoeveel later hij wakker wordt dan gevraagd.
+
+Gebruik:
+    python benchmarks/bench_loop_lag.py --tracks 200 --workers 4 --cpu-ms 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run_all import percentile  # noqa: E402
+from utils.extract_pool import ExtractPool, ProcessExtractPool  # noqa: E402
+
+TICK = 0.010
+
+
+class CpuBoundYoutubeDL:
+    """
+    Vervangt yt_dlp.YoutubeDL: wacht op 'netwerk' en verbrandt daarna CPU-tijd in Python.
+    """
+
+    def __init__(self, opts):
+        self.network = opts.get("network", 0.02)
+        self.cpu = opts.get("cpu", 0.03)
+
+    def extract_info(self, query, download=False):
+        time.sleep(self.network)
+        deadline = time.thread_time() + self.cpu
+        n = 0
+        while time.thread_time() < deadline:
+            n += 1
+        return {"id": query, "title": f"Track {query}", "url": f"https://example.invalid/{query}",
+                "duration": 180, "formats": [{"format_id": str(i)} for i in range(50)]}
+
+
+async def monitor(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - start - TICK)
+
+
+async def run(pool_class, tracks, workers, network, cpu):
+    pool = pool_class({"network": network, "cpu": cpu}, max_workers=workers, ydl_factory=CpuBoundYoutubeDL)
+    await pool.extract("warmup")
+    lags, stop = [], asyncio.Event()
+    monitor_task = asyncio.create_task(monitor(lags, stop))
+    start = time.perf_counter()
+    results = await pool.extract_many([str(i) for i in range(tracks)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+    pool.close()
+    assert all(r.error is None for r in results)
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "mean": statistics.fmean(lags),
+        "p99": percentile(lags, 0.99),
+        "max": lags[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--network-ms", type=float, default=20)
+    parser.add_argument("--cpu-ms", type=float, default=30)
+    args = parser.parse_args()
+
+    print(f"{args.tracks} tracks, {args.workers} workers, {args.network_ms:.0f} ms netwerk + {args.cpu_ms:.0f} ms CPU per extractie")
+    print(f"{'backend':<8} {'tijd (s)':>9} {'lag gem (ms)':>13} {'lag p99 (ms)':>13} {'lag max (ms)':>13}")
+    # De process-pool eerst: hij moet geforkt worden voordat er (pool-)threads draaien.
+    for name, pool_class in (("process", ProcessExtractPool), ("thread", ExtractPool)):
+        r = asyncio.run(run(pool_class, args.tracks, args.workers, args.network_ms / 1000, args.cpu_ms / 1000))
+        print(f"{name:<8} {r['elapsed']:>9.2f} {r['mean'] * 1000:>13.1f} {r['p99'] * 1000:>13.1f} {r['max'] * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: CPU-tijd per stream voor de PCM-route (FFmpeg decodeert, discord.py codeert naar Opus)
+tegenover de Opus-passthrough (FFmpeg kopieert de Opus-pakketten).
+
+Maakt zelf een lokaal webm/opus testbestand aan met FFmpeg als er geen --sample is opgegeven.
+Het Opus-coderen in Python wordt alleen gemeten als discord.py met libopus beschikbaar is.
+
+Gebruik:
+    python benchmarks/bench_opus.py --seconds 60
+"""
+import argparse
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+# Dezelfde argumenten als discord.FFmpegPCMAudio en discord.FFmpegOpusAudio(codec="copy").
+PCM_ARGS = ["-f", "s16le", "-ar", "48000", "-ac", "2", "-loglevel", "warning", "pipe:1"]
+OPUS_COPY_ARGS = ["-map_metadata", "-1", "-f", "opus", "-c:a", "copy", "-ar", "48000", "-ac", "2",
+                  "-b:a", "128k", "-loglevel", "warning", "pipe:1"]
+FRAME_BYTES = 3840  # 20 ms stereo 16-bit PCM op 48 kHz
+
+
+def make_sample(path, seconds):
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-ac", "2", "-ar", "48000", "-c:a", "libopus", "-b:a", "128k", path],
+        check=True,
+    )
+
+
+def child_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_ffmpeg(sample, args):
+    """
+    Draait FFmpeg op het testbestand en geeft (cpu-seconden, uitvoer) terug.
+    """
+    before = child_cpu()
+    out = subprocess.run(["ffmpeg", "-i", sample, "-vn", *args], check=True, stdout=subprocess.PIPE).stdout
+    return child_cpu() - before, out
+
+
+def encode_pcm(pcm):
+    """
+    Codeert de PCM-uitvoer frame voor frame naar Opus zoals discord.py dat doet.
+    Geeft de CPU-tijd terug, of None als discord.py/libopus niet beschikbaar is.
+    """
+    try:
+        from discord.opus import Encoder
+        encoder = Encoder()
+    except Exception:
+        return None
+    start = time.process_time()
+    for i in range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES):
+        encoder.encode(pcm[i:i + FRAME_BYTES], encoder.SAMPLES_PER_FRAME)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", help="bestaand webm/opus bestand (standaard: zelf genereren)")
+    parser.add_argument("--seconds", type=int, default=60, help="lengte van het gegenereerde testbestand")
+    args = parser.parse_args()
+
+    sample = args.sample
+    if not sample:
+        sample = os.path.join(tempfile.mkdtemp(), "sample.webm")
+        make_sample(sample, args.seconds)
+    duration = float(subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", sample],
+        check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout.strip())
+
+    pcm_ffmpeg, pcm = run_ffmpeg(sample, PCM_ARGS)
+    pcm_encode = encode_pcm(pcm)
+    copy_ffmpeg, _ = run_ffmpeg(sample, OPUS_COPY_ARGS)
+
+    print(f"Testbestand: {sample} ({duration:.1f} s audio)")
+    print(f"{'route':<28} {'cpu (s)':>9} {'cpu % van realtime':>20}")
+    rows = [("PCM: ffmpeg decode", pcm_ffmpeg)]
+    if pcm_encode is not None:
+        rows.append(("PCM: opus encode (python)", pcm_encode))
+        rows.append(("PCM: totaal", pcm_ffmpeg + pcm_encode))
+    else:
+        rows.append(("PCM: opus encode (python)", None))
+    rows.append(("Opus passthrough", copy_ffmpeg))
+    for name, cpu in rows:
+        if cpu is None:
+            print(f"{name:<28} {'n.v.t. (geen libopus)':>30}")
+        else:
+            print(f"{name:<28} {cpu:>9.3f} {100 * cpu / duration:>19.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Micro-benchmark voor de wachtrij: Track/TrackQueue tegenover de oude deque met dicts,
+voor wachtrijen van 10k nummers, en de extra kosten van het wachtrij-journal op add/pop.
+
+Gebruik:
+    python benchmarks/bench_queue.py --tracks 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import queue_manager  # noqa: E402
+from utils.queue_manager import Track, TrackQueue, add_to_queue, pop_next_song  # noqa: E402
+
+
+def make_dicts(n):
+    return [
+        {
+            "id": f"vid{i:08d}",
+            "title": f"Nummer {i}",
+            "webpage_url": f"https://www.youtube.com/watch?v=vid{i:08d}",
+            "duration": 180 + i % 120,
+            "thumbnail": f"https://i.ytimg.com/vi/vid{i:08d}/hqdefault.jpg",
+            "requester": "bench",
+        }
+        for i in range(n)
+    ]
+
+
+def memory(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def bench(label, stmt, number):
+    seconds = timeit.timeit(stmt, number=number) / number
+    print(f"{label:<34} {seconds * 1e6:>12.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000)
+    args = parser.parse_args()
+    n = args.tracks
+    dicts = make_dicts(n)
+
+    old = deque(dicts)
+    new = TrackQueue(Track.from_dict(d) for d in dicts)
+
+    print(f"Wachtrij van {n} nummers")
+    print(f"{'geheugen deque[dict]':<34} {memory(lambda: deque(make_dicts(n))) / 1024:>12.0f} KiB")
+    print(f"{'geheugen TrackQueue[Track]':<34} "
+          f"{memory(lambda: TrackQueue(Track.from_dict(d) for d in make_dicts(n))) / 1024:>12.0f} KiB")
+    bench("totale duur: sum over deque", lambda: sum(s.get("duration", 0) for s in old), 200)
+    bench("totale duur: TrackQueue", lambda: new.total_duration, 200)
+    bench("eerste 20: list(deque)[:20]", lambda: list(old)[:20], 200)
+    bench("eerste 20: TrackQueue.slice", lambda: new.slice(0, 20), 200)
+    bench("remove_at(midden) + extend", lambda: new.extend([new.remove_at(n // 2)]), 200)
+    bench("move(laatste → eerste)", lambda: new.move(n - 1, 0), 200)
+    bench("shuffle", new.shuffle, 20)
+    bench("extend(1) + popleft", lambda: (new.extend([new[0]]), new.popleft()), 2000)
+
+    track = new[0]
+    bench("add_to_queue + pop_next_song", lambda: (add_to_queue(0, [track]), pop_next_song(0)), 20000)
+    with tempfile.TemporaryDirectory() as directory:
+        # Alleen het hete pad: de schrijftaak draait hier niet, het wegschrijven gebeurt op de achtergrond.
+        queue_manager.enable_journal(directory)
+        bench("  idem, met journal", lambda: (add_to_queue(0, [track]), pop_next_song(0)), 20000)
+        queue_manager.journal = None
+
+
+if __name__ == "__main__":
+    main()
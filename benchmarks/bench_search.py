@@ -0,0 +1,83 @@
+"""
+Benchmark: latency van een zoekopdracht in /play, volledig (ytsearch met formats, zoals get_audio_info)
+tegen plat (ytsearchN met alleen id, titel en duur, zoals search_tracks), met een nep-extractor.
+
+`--latency` is de tijd voor de zoekpagina, `--resolve-latency` de extra tijd om van één resultaat de
+formats en stream-URL op te halen. Bij plat zoeken valt dat laatste pas bij het afspelen van het gekozen nummer,
+en dat wordt apart gemeten ("plat + gekozen nummer").
+
+Gebruik:
+    python benchmarks/bench_search.py --runs 20 --latency 0.3 --resolve-latency 0.6
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Gedeelde nep-onderdelen uit tests/.
+from tests.fake_youtube_dl import FakeYoutubeDL  # noqa: E402
+from benchmarks.run_all import percentile  # noqa: E402
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+async def run(runs):
+    import youtube_handler as yh
+    from utils.extract_pool import ExtractPool
+
+    yh._extract_pool = ExtractPool(yh.YDL_OPTS, max_workers=4, ydl_factory=FakeYoutubeDL)
+    yh._search_pool = ExtractPool(yh.FLAT_SEARCH_OPTS, max_workers=4, ydl_factory=FakeYoutubeDL)
+
+    results = {"volledig": [], "plat": [], "plat + gekozen nummer": []}
+    try:
+        for i in range(runs):
+            # Elke run een nieuwe zoekterm, zodat de TrackCache niet meetelt.
+            elapsed, tracks = await timed(yh.get_audio_info([f"volledig zoeken {i}"]))
+            assert tracks
+            results["volledig"].append(elapsed)
+
+            elapsed, tracks = await timed(yh.search_tracks(f"plat zoeken {i}"))
+            assert len(tracks) == yh.SEARCH_RESULTS
+            results["plat"].append(elapsed)
+            resolve, _ = await timed(yh.resolve_stream_url(tracks[0]))
+            results["plat + gekozen nummer"].append(elapsed + resolve)
+    finally:
+        await yh.api_client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--resolve-latency", type=float, default=0.6)
+    args = parser.parse_args()
+
+    FakeYoutubeDL.latency = args.latency
+    FakeYoutubeDL.resolve_latency = args.resolve_latency
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.update({
+            "CACHE_DB_PATH": os.path.join(workdir, "cache.sqlite3"),
+            "HTTP_CACHE_PATH": os.path.join(workdir, "http_cache.sqlite3"),
+        })
+        results = asyncio.run(run(args.runs))
+
+    print(f"{args.runs} zoekopdrachten, zoekpagina {args.latency * 1000:.0f} ms, formats {args.resolve_latency * 1000:.0f} ms")
+    print(f"{'modus':>22} {'gem (ms)':>10} {'p95 (ms)':>10}")
+    for label, values in results.items():
+        ordered = sorted(values)
+        p95 = percentile(ordered, 0.95)
+        print(f"{label:>22} {statistics.fmean(ordered) * 1000:>10.0f} {p95 * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
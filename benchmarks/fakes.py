@@ -0,0 +1,104 @@
+"""
+Nep-onderdelen voor benchmarks zonder netwerk: een voice client die audio in een thread 'afspeelt'
+en lokale WAV-fixtures. De nep-extractor (FakeYoutubeDL) hoort bij de tests: tests/fake_youtube_dl.py.
+"""
+import math
+import os
+import struct
+import threading
+import time
+import wave
+
+FRAME_BYTES = 3840  # 20 ms stereo 16-bit PCM op 48 kHz
+
+
+def make_wav_fixture(path, seconds=1.0, frequency=440):
+    """
+    Schrijft een stereo 48 kHz 16-bit sinus naar path (als die nog niet bestaat) en geeft het pad terug.
+    """
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    samples = int(48000 * seconds)
+    frames = bytearray()
+    for i in range(samples):
+        value = int(12000 * math.sin(2 * math.pi * frequency * i / 48000))
+        frames += struct.pack("<hh", value, value)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(48000)
+        f.writeframes(bytes(frames))
+    return path
+
+
+class FixtureSource:
+    """
+    Audiobron die een lokale WAV-fixture in frames van 20 ms teruggeeft, zoals FFmpegPCMAudio.
+    """
+
+    def __init__(self, path):
+        self._wav = wave.open(path, "rb")
+
+    def read(self):
+        data = self._wav.readframes(960)
+        return data if len(data) == FRAME_BYTES else b""
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self._wav.close()
+
+
+class StubVoiceClient:
+    """
+    Voice client die de bron in een eigen thread leest (zoals de AudioPlayer van discord.py)
+    en daarna de after-callback aanroept. Met speed > 1 speelt hij sneller dan realtime.
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.started = []        # perf_counter op elk play()-moment
+        self._playing = False
+        self._stop = threading.Event()
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self._playing
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after=None):
+        if self._playing:
+            raise RuntimeError("Already playing audio.")
+        self._playing = True
+        self._stop.clear()
+        self.started.append(time.perf_counter())
+
+        def run():
+            error = None
+            try:
+                while not self._stop.is_set() and source.read():
+                    time.sleep(0.02 / self.speed)
+            except Exception as e:
+                error = e
+            finally:
+                source.cleanup()
+                self._playing = False
+                if after:
+                    after(error)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class StubGuild:
+    def __init__(self, guild_id, voice_client):
+        self.id = guild_id
+        self.voice_client = voice_client
@@ -0,0 +1,260 @@
+"""
+Reproduceerbare benchmarks voor de hete paden van de bot, volledig zonder netwerk:
+time-to-first-audio (enkel nummer en playlist van 500), wachtrij-operaties,
+het bouwen van de 'toegevoegd' embed, /play autocomplete en de stilte tussen nummers.
+
+Gebruikt een nep-extractor met instelbare latency, een lokale stand-in van de YouTube API,
+een stub voice client en een lokale WAV-fixture. Schrijft de resultaten als JSON weg,
+zodat runs met elkaar vergeleken kunnen worden.
+
+Gebruik:
+    python benchmarks/run_all.py --latency 0.05 --output benchmarks/results/mijn-run.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FixtureSource, StubGuild, StubVoiceClient, make_wav_fixture  # noqa: E402
+# Gedeelde nep-onderdelen uit tests/.
+from tests.fake_youtube_api import FakeYoutubeApi  # noqa: E402
+from tests.fake_youtube_dl import FakeYoutubeDL  # noqa: E402
+
+
+def percentile(ordered, q):
+    """
+    Nearest-rank percentiel van een gesorteerde lijst: de kleinste waarde waar minstens q van de metingen onder valt.
+    """
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": percentile(ordered, 0.5),
+        "p95": percentile(ordered, 0.95),
+        "max": ordered[-1],
+    }
+
+
+async def wait_for(condition, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Benchmark wachtte te lang")
+        await asyncio.sleep(0.001)
+
+
+class Bench:
+    def __init__(self, yh, fixture):
+        self.yh = yh
+        self.fixture = fixture
+        self.next_guild_id = 1
+
+    def new_guild(self, speed=50.0):
+        guild = StubGuild(self.next_guild_id, StubVoiceClient(speed=speed))
+        self.next_guild_id += 1
+        return guild
+
+    async def create_source(self, song):
+        await self.yh.resolve_stream_url(song)
+        return FixtureSource(self.fixture)
+
+    async def ttfa_single(self, runs):
+        from utils.player import GuildPlayer
+        from utils.queue_manager import add_to_queue
+
+        samples = []
+        for i in range(runs):
+            guild = self.new_guild()
+            player = GuildPlayer(guild, self.create_source)
+            start = time.perf_counter()
+            tracks = await self.yh.get_audio_info([f"https://www.youtube.com/watch?v=single{i:05d}"])
+            add_to_queue(guild.id, tracks)
+            player.play()
+            await wait_for(lambda: guild.voice_client.started)
+            samples.append(guild.voice_client.started[0] - start)
+            player.close()
+        return percentiles(samples)
+
+    async def ttfa_playlist(self, api, tracks):
+        from utils.player import GuildPlayer
+        from utils.queue_manager import add_to_queue, reset_queue
+
+        guild = self.new_guild()
+        player = GuildPlayer(guild, self.create_source)
+        calls_before = dict(api.calls)
+        start = time.perf_counter()
+        first_audio = None
+        count = 0
+        async for batch in self.yh.iter_playlist_tracks("https://www.youtube.com/playlist?list=PLbench"):
+            add_to_queue(guild.id, batch)
+            count += len(batch)
+            if first_audio is None:
+                player.play()
+                await wait_for(lambda: guild.voice_client.started)
+                first_audio = guild.voice_client.started[0] - start
+        imported = time.perf_counter() - start
+        guild.voice_client.stop()
+        reset_queue(guild.id)
+        player.close()
+        return {
+            "tracks": count,
+            "expected_tracks": tracks,
+            "time_to_first_audio": first_audio,
+            "import_complete": imported,
+            "api_calls": {k: api.calls[k] - calls_before[k] for k in api.calls},
+        }
+
+    def queue_ops(self, size):
+        from utils.queue_manager import Track, TrackQueue
+
+        queue = TrackQueue(Track(id=f"q{i:06d}", title=f"Nummer {i}", duration=180 + i % 60) for i in range(size))
+        track = Track(id="extra", duration=200)
+        number = 2000
+
+        def ops_per_second(fn, n=number):
+            return n / timeit.timeit(fn, number=n)
+
+        return {
+            "size": size,
+            "extend_popleft_per_s": ops_per_second(lambda: (queue.extend([track]), queue.popleft())),
+            "slice20_per_s": ops_per_second(lambda: queue.slice(0, 20)),
+            "total_duration_per_s": ops_per_second(lambda: queue.total_duration),
+            "move_per_s": ops_per_second(lambda: queue.move(size - 1, 0)),
+            "shuffle_per_s": ops_per_second(queue.shuffle, n=20),
+        }
+
+    def embed_build(self, size):
+        try:
+            from utils.embed_builder import build_added_embed
+        except ImportError as e:
+            return {"skipped": f"discord.py niet beschikbaar: {e}"}
+        from utils.queue_manager import Track, TrackQueue
+
+        queue = TrackQueue(Track(id=f"e{i:06d}", title=f"Nummer {i}", duration=180) for i in range(size))
+        track = queue[0]
+        n = 2000
+        seconds = timeit.timeit(lambda: build_added_embed(track, "bench", queue), number=n) / n
+        return {"queue_size": size, "us_per_embed": seconds * 1e6}
+
+    def autocomplete(self, size):
+        from utils.autocomplete import TitleIndex
+        from utils.queue_manager import Track
+
+        index = TitleIndex()
+        words = "never gonna give you up let down run around desert official video live remix".split()
+        start = time.perf_counter()
+        index.load(Track(id=f"a{i:06d}", title=" ".join(words[(i * 7 + j) % len(words)] for j in range(5)))
+                   for i in range(size))
+        build = time.perf_counter() - start
+        queries = ["g", "gonna", "gonna give", "never gonna give you", "zzz", ""]
+        n = 200
+        seconds = timeit.timeit(lambda: [index.search(q, guild_id=1) for q in queries], number=n) / (n * len(queries))
+        return {"titles": size, "build_s": build, "us_per_search": seconds * 1e6}
+
+    async def inter_track_gap(self, tracks, lead):
+        from utils.player import GuildPlayer
+        from utils.prewarm import GapRecorder, Prewarmer
+        from utils.queue_manager import Track, add_to_queue
+
+        results = {}
+        for label, prewarm_lead in (("zonder_prewarm", 0), ("met_prewarm", lead)):
+            guild = self.new_guild(speed=1.0)
+            recorder = GapRecorder()
+            prewarmer = Prewarmer(self.create_source, lead=prewarm_lead)
+            player = GuildPlayer(guild, self.create_source, prewarmer=prewarmer, gap_recorder=recorder)
+            # Korte nummers (duur = lengte van de fixture) zodat de prewarm-timer binnen de meting valt.
+            add_to_queue(guild.id, [Track(id=f"gap{label}{i:04d}", duration=1) for i in range(tracks)])
+            player.play()
+            await wait_for(
+                lambda: len(guild.voice_client.started) == tracks and not guild.voice_client.is_playing(),
+                timeout=tracks * 5,
+            )
+            player.close()
+            results[label] = recorder.summary()
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+async def run(args, workdir):
+    api = FakeYoutubeApi(videos=args.playlist_size).start()
+    os.environ.update({
+        "YOUTUBE_API_KEY": "bench",
+        "YOUTUBE_API_BASE_URL": api.base_url,
+        "CACHE_DB_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "HTTP_CACHE_PATH": os.path.join(workdir, "http_cache.sqlite3"),
+        "EXTRACT_WORKERS": str(args.workers),
+    })
+    import youtube_handler as yh
+    from utils.extract_pool import ExtractPool
+
+    FakeYoutubeDL.latency = args.latency
+    yh._extract_pool = ExtractPool(yh.YDL_OPTS, max_workers=args.workers, ydl_factory=FakeYoutubeDL)
+    bench = Bench(yh, make_wav_fixture(os.path.join(workdir, "fixture.wav"), seconds=1.0))
+
+    try:
+        results = {
+            "ttfa_single_s": await bench.ttfa_single(args.runs),
+            "ttfa_playlist": await bench.ttfa_playlist(api, args.playlist_size),
+            "queue_ops": bench.queue_ops(args.queue_size),
+            "embed_build": bench.embed_build(args.queue_size),
+            "autocomplete": bench.autocomplete(args.queue_size),
+            "inter_track_gap": await bench.inter_track_gap(args.gap_tracks, lead=0.5),
+        }
+    finally:
+        await yh.api_client.close()
+        api.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="latency van de nep-extractor in seconden")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=20, help="aantal metingen voor time-to-first-audio")
+    parser.add_argument("--playlist-size", type=int, default=500)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--gap-tracks", type=int, default=5)
+    parser.add_argument("--output", help="JSON-bestand (standaard benchmarks/results/<tijd>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, workdir))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Resultaten opgeslagen in {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,161 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import hashlib
+import json
 import logging
 import os
 from dotenv import load_dotenv
 
-from youtube_handler import get_audio_info, get_audio_info_fast
-from utils.queue_manager import add_to_queue, get_queue, reset_queue, pop_next_song
-from utils.audio_utils import get_ffmpeg_audio_source
+from youtube_handler import (
+    get_audio_info, iter_playlist_tracks, iter_spotify_tracks, resolve_stream_url, prefetch_stream_urls, api_client,
+    track_cache, extraction_flight, warm_up, search_tracks, remember_track, start_process_pool,
+)
+from spotify_handler import is_spotify_url
+from utils.queue_manager import (
+    add_to_queue, get_queue, reset_queue, register_import,
+    queue_length, remove_from_queue, move_in_queue, shuffle_queue, queue_map, enable_journal,
+)
+from utils.audio_utils import get_ffmpeg_audio_source, count_ffmpeg_processes, format_duration
+from utils.embed_builder import build_added_embed
+from utils.prewarm import Prewarmer, GapRecorder
+from utils.player import GuildPlayer
+from utils.audio_cache import AudioCache
+from utils.broadcast import Broadcaster
+from utils.now_playing import NowPlayingTicker
+from utils.autocomplete import TitleIndex, watch_url
+from utils.loudness import LoudnessNormalizer, LOUDNESS_NORMALIZE
+from utils.ffmpeg_supervisor import FFmpegSupervisor
+from utils.metrics import (
+    registry, SOURCE_SECONDS, COMMAND_SECONDS, EXTRACT_SECONDS, API_SECONDS, LOOP_LAG_SECONDS, STARTUP_SECONDS,
+    monitor_loop_lag, start_metrics_server, process_uptime, rss_bytes,
+)
 
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9105"))  # 0 = geen metrics-endpoint
+COMMAND_HASH_PATH = os.getenv("COMMAND_HASH_PATH", "data/command_tree.sha256")
+AUTOCOMPLETE_PATH = os.getenv("AUTOCOMPLETE_PATH", "data/autocomplete.json")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "auto")  # 'auto' (bovenste hit), 'pick' (keuzemenu) of 'full'
+SEARCH_PICK_TIMEOUT = 60                       # seconden dat het keuzemenu bruikbaar blijft
+AUTOCOMPLETE_SAVE_INTERVAL = 300  # seconden tussen het wegschrijven van de autocomplete-index
+QUEUE_JOURNAL_DIR = os.getenv("QUEUE_JOURNAL_DIR", "data/queues")  # leeg = wachtrijen niet bewaren
+BOT_PROFILE = os.getenv("BOT_PROFILE", "lowmem")  # 'lowmem' of 'full' (alle intents en caches)
+SHARD_COUNT = os.getenv("SHARD_COUNT")  # niet ingesteld = geen sharding, 'auto' = aantal van Discord
+SHARD_IDS = os.getenv("SHARD_IDS")      # bv. '0,1' om in dit proces alleen die shards te draaien
+
+
+def queue_journal_dir():
+    """
+    Map van het wachtrij-journal voor dit proces. Met SHARD_IDS krijgt elk proces een eigen submap:
+    bij compactie schrijft een proces alleen zijn eigen guilds weg en leegt het journal, dus delen kan niet.
+    """
+    if SHARD_COUNT and SHARD_COUNT != "auto" and SHARD_IDS:
+        shard_ids = "-".join(str(int(shard_id)) for shard_id in SHARD_IDS.split(","))
+        return os.path.join(QUEUE_JOURNAL_DIR, f"shards-{shard_ids}")
+    return QUEUE_JOURNAL_DIR
+
+
+async def sync_commands_if_changed(bot):
+    """
+    Synchroniseert de slash commands alleen als de command tree veranderd is sinds de vorige sync.
+    De hash wordt bewaard in COMMAND_HASH_PATH; verwijder dat bestand om een sync te forceren.
+    """
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    digest = hashlib.sha256(
+        json.dumps([bot.application_id, payload], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    try:
+        with open(COMMAND_HASH_PATH) as f:
+            if f.read().strip() == digest:
+                logging.info("Slash commands ongewijzigd; sync overgeslagen.")
+                return
+    except FileNotFoundError:
+        pass
 
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="#", intents=intents)
+    try:
+        synced = await bot.tree.sync()
+    except Exception as e:
+        print(f"Slash commands sync fout: {e}")
+        return
+    print(f"Slash commands gesynchroniseerd: {len(synced)}")
+    os.makedirs(os.path.dirname(COMMAND_HASH_PATH) or ".", exist_ok=True)
+    with open(COMMAND_HASH_PATH, "w") as f:
+        f.write(digest)
+
+
+# Met sharding draait één proces meerdere gateway-verbindingen (of, met SHARD_IDS, een deel ervan).
+BotBase = commands.AutoShardedBot if SHARD_COUNT else commands.Bot
+
+
+class MusicBot(BotBase):
+    async def setup_hook(self):
+        # setup_hook draait één keer na het inloggen, niet bij elke reconnect zoals on_ready.
+        self.loop.create_task(monitor_loop_lag())
+        self.metrics_runner = await start_metrics_server(METRICS_PORT) if METRICS_PORT else None
+        await sync_commands_if_changed(self)
+        self.loop.create_task(warm_up())
+        # De cache wordt hier gelezen (SQLite-verbinding hoort bij deze thread), het opbouwen gebeurt ernaast.
+        await asyncio.to_thread(title_index.load, track_cache.recent_tracks())
+        self.loop.create_task(save_title_index_periodically())
+        if QUEUE_JOURNAL_DIR:
+            try:
+                self.queue_journal = await asyncio.to_thread(enable_journal, queue_journal_dir())
+                self.queue_journal.start()
+            except BlockingIOError:
+                logging.error(f"[QUEUE] {queue_journal_dir()} is in gebruik door een ander proces; wachtrijen worden niet bewaard.")
+
+    async def close(self):
+        # Eerst het journal afsluiten: het verbreken van de voice-verbindingen hierna mag de bewaarde wachtrijen niet leegmaken.
+        if getattr(self, "queue_journal", None):
+            self.queue_journal.close()
+        if getattr(self, "metrics_runner", None):
+            await self.metrics_runner.cleanup()
+        if title_index.dirty:
+            title_index.write(title_index.snapshot())
+        await api_client.close()
+        await super().close()
+
+
+title_index = TitleIndex(AUTOCOMPLETE_PATH)
+
+
+async def save_title_index_periodically():
+    while True:
+        await asyncio.sleep(AUTOCOMPLETE_SAVE_INTERVAL)
+        if title_index.dirty:
+            try:
+                await asyncio.to_thread(title_index.write, title_index.snapshot())
+            except OSError as e:
+                logging.warning(f"[AUTOCOMPLETE] Index kon niet opgeslagen worden: {e}")
+
+
+def bot_options():
+    """
+    Bepaalt intents en caches voor het gekozen profiel. De muziekfuncties hebben alleen guilds en
+    voice states nodig; in 'lowmem' worden geen leden, presences of berichten gecachet, behalve
+    de leden die in een voice channel zitten (die horen bij de voice states).
+    """
+    if BOT_PROFILE == "full":
+        options = {"intents": discord.Intents.all()}
+    else:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.voice_states = True
+        options = {
+            "intents": intents,
+            "member_cache_flags": discord.MemberCacheFlags.from_intents(intents),
+            "chunk_guilds_at_startup": False,
+            "max_messages": None,
+        }
+    if SHARD_COUNT and SHARD_COUNT != "auto":
+        options["shard_count"] = int(SHARD_COUNT)
+        if SHARD_IDS:
+            options["shard_ids"] = [int(shard_id) for shard_id in SHARD_IDS.split(",")]
+    return options
+
+
+bot = MusicBot(command_prefix="#", **bot_options())
 
 logging.basicConfig(level=logging.DEBUG)
 logging.basicConfig(level=logging.INFO)
@@ -37,9 +179,9 @@ class PlayerControls(discord.ui.View):
     async def stop(self, interaction: discord.Interaction, button: discord.ui.Button):
         vc = interaction.guild.voice_client
         if vc:
+            stop_playback_state(interaction.guild.id)
             vc.stop()
             await vc.disconnect()
-            reset_queue(interaction.guild.id)
             await interaction.response.send_message("Bot gestopt en gedisconnect.", ephemeral=True)
         else:
             await interaction.response.send_message("Bot is niet verbonden.", ephemeral=True)
@@ -51,13 +193,58 @@ class PlayerControls(discord.ui.View):
             await interaction.response.send_message("De wachtrij is leeg.", ephemeral=True)
             return
         embed = discord.Embed(title="🎶 Wachtrij", color=discord.Color.blue())
-        for i, song in enumerate(list(queue)[:20], 1):
-            embed.add_field(name=f"{i}. {song.get('title', 'Onbekend')}", value=f"Gevraagd door: {song.get('requester', 'Onbekend')}", inline=False)
+        for i, song in enumerate(queue.slice(0, 20), 1):
+            embed.add_field(name=f"{i}. {song.title}", value=f"Gevraagd door: {song.requester or 'Onbekend'}", inline=False)
         if len(queue) > 20:
             embed.set_footer(text=f"...en {len(queue) - 20} meer nummers in de wachtrij.")
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
+class SearchPicker(discord.ui.View):
+    """
+    Keuzemenu met de resultaten van een snelle zoekopdracht. Alleen wie zocht kan kiezen;
+    het gekozen nummer gaat de wachtrij in en wordt pas bij het afspelen volledig opgehaald.
+    """
+
+    def __init__(self, user_id, tracks):
+        super().__init__(timeout=SEARCH_PICK_TIMEOUT)
+        self.user_id = user_id
+        self.tracks = tracks
+        self.message = None
+        select = discord.ui.Select(
+            placeholder="Kies een nummer",
+            options=[
+                discord.SelectOption(label=track.title[:100], description=format_duration(track.duration), value=str(i))
+                for i, track in enumerate(tracks)
+            ],
+        )
+        select.callback = self.choose
+        self.add_item(select)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Alleen wie zocht kan een nummer kiezen.", ephemeral=True)
+            return False
+        return True
+
+    async def choose(self, interaction: discord.Interaction):
+        track = self.tracks[int(interaction.data["values"][0])]
+        self.stop()
+        remember_track(track)
+        track.requester = interaction.user.display_name
+        add_to_queue(interaction.guild.id, [track])
+        title_index.add_tracks([track], interaction.guild.id)
+        queue = get_queue(interaction.guild.id)
+        await interaction.response.edit_message(
+            content=None, embed=build_added_embed(track, track.requester, queue), view=PlayerControls(interaction)
+        )
+        await start_playing(interaction)
+
+    async def on_timeout(self):
+        if self.message:
+            await self.message.edit(content="Geen keuze gemaakt; zoek opnieuw met /play.", view=None)
+
+
 async def ensure_voice(interaction):
     if interaction.user.voice is None or interaction.user.voice.channel is None:
         await interaction.followup.send("Je moet in een voice channel zitten!")
@@ -70,109 +257,229 @@ async def ensure_voice(interaction):
     return interaction.guild.voice_client
 
 
-async def play_next(interaction):
-    queue = get_queue(interaction.guild.id)
-    if not queue:
-        return
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR")  # niet ingesteld = audiocache uit
+audio_cache = AudioCache(
+    AUDIO_CACHE_DIR,
+    max_bytes=int(os.getenv("AUDIO_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+    min_plays=int(os.getenv("AUDIO_CACHE_MIN_PLAYS", "3")),
+) if AUDIO_CACHE_DIR else None
 
-    song = pop_next_song(interaction.guild.id)
-    if not song:
-        return
 
-    stream_url = song.get("url") or song.get("webpage_url")
-    if not stream_url:
-        return
+BROADCAST_MODE = os.getenv("BROADCAST_MODE", "off") == "on"
+broadcaster = Broadcaster(join_window=float(os.getenv("BROADCAST_JOIN_WINDOW", "0.5"))) if BROADCAST_MODE else None
 
-    voice_client = interaction.guild.voice_client
-    if not voice_client or not voice_client.is_connected():
-        voice_client = await ensure_voice(interaction)
-        if not voice_client or not voice_client.is_connected():
-            return
 
+async def loudness_input(song):
+    """
+    Bron voor een loudness-meting: het lokale bestand uit de audiocache als dat er is, anders de stream.
+    """
+    path = audio_cache.peek(song.id) if audio_cache else None
+    if path:
+        return path
+    return (await resolve_stream_url(song)).url
+
+
+loudness = LoudnessNormalizer(track_cache, loudness_input) if LOUDNESS_NORMALIZE else None
+ffmpeg_supervisor = FFmpegSupervisor()
+
+
+async def open_ffmpeg_source(song, start_seconds=None):
+    if audio_cache:
+        cached = audio_cache.lookup(song.id)
+        if cached:
+            path, acodec = cached
+            gain = loudness.gain_for(song.id, acodec) if loudness else None
+            return get_ffmpeg_audio_source(path, acodec, gain, start_seconds)
+    stream = await resolve_stream_url(song)
+    gain = loudness.gain_for(song.id, stream.acodec) if loudness else None
+    return get_ffmpeg_audio_source(stream.url, stream.acodec, gain, start_seconds)
+
+
+async def create_direct_source(song, wait=True, start_seconds=None):
+    """
+    Start FFmpeg voor een nummer onder toezicht van de supervisor; die begrenst het aantal streams
+    en herstart de stream op dezelfde positie als hij vastloopt.
+    """
+    await ffmpeg_supervisor.acquire(wait)
     try:
-        source = get_ffmpeg_audio_source(stream_url)
-    except Exception as e:
-        logging.error(f"Fout bij het maken van audio bron: {e}")
-        await play_next(interaction)
-        return
+        source = await open_ffmpeg_source(song, start_seconds)
+    except BaseException:
+        ffmpeg_supervisor.release()
+        raise
+    return ffmpeg_supervisor.supervise(
+        source, song.title, lambda offset: open_ffmpeg_source(song, (start_seconds or 0) + offset)
+    )
+
+
+async def create_source(song, wait=True, start_seconds=None):
+    """
+    Maakt de audiobron voor een nummer. In broadcast-modus luisteren guilds die hetzelfde
+    nummer (bijna) tegelijk spelen mee met één gedeelde FFmpeg/Opus-pijplijn;
+    een nummer dat halverwege hervat wordt (start_seconds) krijgt altijd een eigen pijplijn.
+    """
+    with SOURCE_SECONDS.time():
+        if not broadcaster or start_seconds:
+            return await create_direct_source(song, wait, start_seconds)
+        listener = broadcaster.join(song.id)
+        if listener:
+            return listener
+        return broadcaster.start(song.id, await create_direct_source(song, wait))
+
+
+def on_track_start(guild_id, song, offset=0):
+    prefetch_stream_urls(get_queue(guild_id))
+    now_playing.start(guild_id, song, offset)
+    if audio_cache:
+        audio_cache.record_play(song)
+    if loudness:
+        loudness.schedule(song)
+
+
+# Voorbereiden wacht niet op een vrije stream: een prewarm mag geen plek bezetten die een guild nu nodig heeft.
+prewarmer = Prewarmer(lambda song: create_source(song, wait=False))
+gap_recorder = GapRecorder()
+players = {}  # guild_id → GuildPlayer
+
+
+def current_track(guild_id):
+    player = players.get(guild_id)
+    return player.current if player else None
+
+
+now_playing = NowPlayingTicker(current_track)
+
+
+def notify_guild(guild_id, message):
+    channel = now_playing.channel_for(guild_id)
+    if channel is not None:
+        asyncio.create_task(channel.send(message))
+
+registry.gauge("musicbot_voice_clients", "Aantal actieve voice-verbindingen", lambda: len(bot.voice_clients))
+registry.gauge("musicbot_queued_tracks", "Totaal aantal nummers in alle wachtrijen",
+               lambda: sum(len(queue) for queue in queue_map.values()))
+registry.gauge("musicbot_max_queue_length", "Langste wachtrij over alle guilds",
+               lambda: max((len(queue) for queue in queue_map.values()), default=0))
+registry.gauge("musicbot_ffmpeg_processes", "Aantal draaiende FFmpeg-processen", count_ffmpeg_processes)
+registry.gauge("musicbot_ffmpeg_cpu_percent", "CPU-gebruik van alle FFmpeg-streams samen (procent van één kern)",
+               ffmpeg_supervisor.total_cpu_percent)
+registry.gauge("musicbot_ffmpeg_rss_bytes", "Geheugengebruik (RSS) van alle FFmpeg-streams samen",
+               ffmpeg_supervisor.total_rss)
+registry.gauge("musicbot_guilds", "Aantal guilds in dit proces", lambda: len(bot.guilds))
+registry.gauge("musicbot_rss_bytes_per_guild", "Geheugengebruik (RSS) van het proces gedeeld door het aantal guilds",
+               lambda: rss_bytes() / max(1, len(bot.guilds)))
+
+
+def get_player(guild):
+    """
+    Geeft de speler van een guild terug en start hem bij het eerste gebruik.
+    """
+    player = players.get(guild.id)
+    if player is None:
+        player = players[guild.id] = GuildPlayer(
+            guild,
+            create_source,
+            prewarmer=prewarmer,
+            gap_recorder=gap_recorder,
+            on_track_start=on_track_start,
+            on_error=notify_guild,
+        )
+    return player
+
+
+def stop_playback_state(guild_id):
+    """
+    Ruimt de wachtrij, lopende imports en voorbereide bronnen van een guild op.
+    """
+    reset_queue(guild_id)
+    prewarmer.cancel(guild_id)
+    gap_recorder.reset(guild_id)
+    now_playing.stop(guild_id)
+    if guild_id in players:
+        players[guild_id].stop()
+
+
+async def start_playing(interaction):
+    """
+    Zorgt voor een voice-verbinding en laat de speler starten als er nu niets speelt.
+    """
+    now_playing.bind_channel(interaction.guild.id, interaction.channel)
+    voice_client = interaction.guild.voice_client
+    if not voice_client or not voice_client.is_playing():
+        if await ensure_voice(interaction):
+            get_player(interaction.guild).play()
 
-    def after_playing(error):
-        if error:
-            logging.error(f"Fout bij afspelen: {error}")
-        fut = asyncio.run_coroutine_threadsafe(play_next(interaction), bot.loop)
-        try:
-            fut.result()
-        except Exception as e:
-            logging.error(f"Fout bij play_next: {e}")
 
+async def import_tracks(interaction, batches, requester):
+    """
+    Voegt de nummers van een playlist (YouTube of Spotify) toe zodra ze binnenkomen.
+    Het afspelen start na het eerste nummer; de rest volgt in batches.
+    """
+    started = False
     try:
-        voice_client.play(source, after=after_playing)
+        async for batch in batches:
+            for t in batch:
+                t.requester = requester
+            add_to_queue(interaction.guild.id, batch)
+            title_index.add_tracks(batch, interaction.guild.id)
+
+            if not started:
+                started = True
+                queue = get_queue(interaction.guild.id)
+                await interaction.followup.send(embed=build_added_embed(batch[0], requester, queue), view=PlayerControls(interaction))
+
+                await start_playing(interaction)
+
+        if not started:
+            await interaction.followup.send("Er zijn geen afspeelbare nummers gevonden in deze playlist.")
+    except asyncio.CancelledError:
+        logging.info(f"Playlist-import geannuleerd voor guild {interaction.guild.id}.")
+        raise
     except Exception as e:
-        logging.error(f"Fout bij voice_client.play: {e}")
-        await play_next(interaction)
+        logging.error(f"Fout bij playlist-import: {e}")
+        if not started:
+            await interaction.followup.send("Er is een fout opgetreden bij het ophalen van audio-informatie.")
 
 
 @bot.tree.command(name="play", description="Speel een nummer, YouTube-link, playlist of zoekopdracht af.")
-@app_commands.describe(query="YouTube-link, playlist of zoekopdracht")
+@app_commands.describe(query="YouTube-link, Spotify-link, playlist of zoekopdracht")
 async def slash_play(interaction: discord.Interaction, query: str):
     await interaction.response.defer(thinking=True)
     requester = interaction.user.display_name
     try:
-        if "playlist" in query or ("list=" in query and "youtube.com" in query):
-            first_tracks, rest_tracks = await get_audio_info_fast(query)
-            if not first_tracks:
-                await interaction.followup.send("Er zijn geen afspeelbare nummers gevonden in deze playlist.")
-                return
-            for t in first_tracks:
-                t['requester'] = requester
-            add_to_queue(interaction.guild.id, first_tracks)
+        if is_spotify_url(query):
+            task = asyncio.create_task(import_tracks(interaction, iter_spotify_tracks(query), requester))
+            register_import(interaction.guild.id, task)
+            return
 
-            queue = get_queue(interaction.guild.id)
-            total_duration = sum(s.get('duration', 0) for s in queue)
-
-            embed = discord.Embed(title="🎶 Nummer toegevoegd", color=discord.Color.blurple())
-            embed.add_field(name="Song", value=first_tracks[0]['title'], inline=False)
-            embed.add_field(name="Requester", value=requester, inline=True)
-            embed.add_field(name="Tijd", value=f"{first_tracks[0]['duration'] // 60}:{first_tracks[0]['duration'] % 60:02} min", inline=True)
-            embed.add_field(name="Totale wachtrij nummers", value=str(len(queue)), inline=True)
-            embed.add_field(name="Totale wachtrij tijd", value=f"{total_duration // 60}:{total_duration % 60:02} min", inline=True)
-            if first_tracks[0].get("thumbnail"):
-                embed.set_thumbnail(url=first_tracks[0]['thumbnail'])
-            await interaction.followup.send(embed=embed, view=PlayerControls(interaction))
-
-            voice_client = interaction.guild.voice_client
-            if not voice_client or not voice_client.is_playing():
-                await ensure_voice(interaction)
-                await play_next(interaction)
-
-            async def add_rest():
-                for t in rest_tracks:
-                    t['requester'] = requester
-                add_to_queue(interaction.guild.id, rest_tracks)
-            asyncio.create_task(add_rest())
+        if "playlist" in query or ("list=" in query and "youtube.com" in query):
+            task = asyncio.create_task(import_tracks(interaction, iter_playlist_tracks(query), requester))
+            register_import(interaction.guild.id, task)
             return
 
-        yt_tracks = await get_audio_info([query])
+        voice_client = interaction.guild.voice_client
+        playing = voice_client is not None and voice_client.is_playing()
+        # Speelt er niets, dan is de stream meteen nodig en is de volledige zoekopdracht één ronde sneller;
+        # anders wacht het nummer in de wachtrij en is plat zoeken genoeg.
+        flat = SEARCH_MODE == "pick" or (SEARCH_MODE == "auto" and playing)
+        if flat and not query.startswith(("http://", "https://")):
+            yt_tracks = await search_tracks(query)
+            if SEARCH_MODE == "pick" and len(yt_tracks) > 1:
+                picker = SearchPicker(interaction.user.id, yt_tracks)
+                picker.message = await interaction.followup.send(f"Resultaten voor **{query}**:", view=picker, wait=True)
+                return
+            yt_tracks = yt_tracks[:1]
+            for t in yt_tracks:
+                remember_track(t)
+        else:
+            yt_tracks = await get_audio_info([query])
         for t in yt_tracks:
-            t['requester'] = requester
+            t.requester = requester
         if yt_tracks:
             add_to_queue(interaction.guild.id, yt_tracks)
+            title_index.add_tracks(yt_tracks, interaction.guild.id)
             queue = get_queue(interaction.guild.id)
-            total_duration = sum(s.get('duration', 0) for s in queue)
-
-            embed = discord.Embed(title="🎶 Nummer toegevoegd", color=discord.Color.blurple())
-            embed.add_field(name="Song", value=yt_tracks[0]['title'], inline=False)
-            embed.add_field(name="Requester", value=requester, inline=True)
-            embed.add_field(name="Tijd", value=f"{yt_tracks[0]['duration'] // 60}:{yt_tracks[0]['duration'] % 60:02} min", inline=True)
-            embed.add_field(name="Totale wachtrij nummers", value=str(len(queue)), inline=True)
-            embed.add_field(name="Totale wachtrij tijd", value=f"{total_duration // 60}:{total_duration % 60:02} min", inline=True)
-            if yt_tracks[0].get("thumbnail"):
-                embed.set_thumbnail(url=yt_tracks[0]['thumbnail'])
-            await interaction.followup.send(embed=embed, view=PlayerControls(interaction))
-            voice_client = interaction.guild.voice_client
-            if not voice_client or not voice_client.is_playing():
-                await ensure_voice(interaction)
-                await play_next(interaction)
+            await interaction.followup.send(embed=build_added_embed(yt_tracks[0], requester, queue), view=PlayerControls(interaction))
+            await start_playing(interaction)
         else:
             await interaction.followup.send("Geen nummers gevonden.")
     except Exception as e:
@@ -180,6 +487,18 @@ async def slash_play(interaction: discord.Interaction, query: str):
         await interaction.followup.send("Er is een fout opgetreden bij het ophalen van audio-informatie.")
 
 
+@slash_play.autocomplete("query")
+async def play_autocomplete(interaction: discord.Interaction, current: str):
+    """
+    Suggesties uit de lokale titelindex, zonder netwerk. De waarde is een watch-URL, zodat een
+    gekozen suggestie via de cache op video-id direct gevonden wordt in plaats van te zoeken.
+    """
+    return [
+        app_commands.Choice(name=title[:100], value=watch_url(video_id))
+        for title, video_id in title_index.search(current, interaction.guild_id)
+    ]
+
+
 @bot.tree.command(name="skip", description="Sla het huidige nummer over.")
 async def slash_skip(interaction: discord.Interaction):
     voice_client = interaction.guild.voice_client
@@ -193,9 +512,9 @@ async def slash_skip(interaction: discord.Interaction):
 async def slash_stop(interaction: discord.Interaction):
     voice_client = interaction.guild.voice_client
     if voice_client:
+        stop_playback_state(interaction.guild.id)
         voice_client.stop()
         await voice_client.disconnect()
-        reset_queue(interaction.guild.id)
         await interaction.response.send_message("Bot gestopt en gedisconnect.")
     else:
         await interaction.response.send_message("Bot is niet verbonden met een voice channel.", ephemeral=True)
@@ -203,8 +522,33 @@ async def slash_stop(interaction: discord.Interaction):
 @bot.tree.command(name="clear", description="Leeg de wachtrij.")
 async def slash_clear(interaction: discord.Interaction):
     reset_queue(interaction.guild.id)
+    prewarmer.cancel(interaction.guild.id)
     await interaction.response.send_message("De wachtrij is geleegd.")
 
+@bot.tree.command(name="shuffle", description="Schud de wachtrij.")
+async def slash_shuffle(interaction: discord.Interaction):
+    shuffle_queue(interaction.guild.id)
+    await interaction.response.send_message("De wachtrij is geschud.")
+
+@bot.tree.command(name="remove", description="Verwijder een nummer uit de wachtrij.")
+@app_commands.describe(positie="Positie in de wachtrij (1 = eerstvolgende)")
+async def slash_remove(interaction: discord.Interaction, positie: int):
+    if not 1 <= positie <= queue_length(interaction.guild.id):
+        await interaction.response.send_message("Ongeldige positie.", ephemeral=True)
+        return
+    song = remove_from_queue(interaction.guild.id, positie - 1)
+    await interaction.response.send_message(f"Verwijderd: {song.title}")
+
+@bot.tree.command(name="move", description="Verplaats een nummer in de wachtrij.")
+@app_commands.describe(van="Huidige positie", naar="Nieuwe positie")
+async def slash_move(interaction: discord.Interaction, van: int, naar: int):
+    length = queue_length(interaction.guild.id)
+    if not (1 <= van <= length and 1 <= naar <= length):
+        await interaction.response.send_message("Ongeldige positie.", ephemeral=True)
+        return
+    move_in_queue(interaction.guild.id, van - 1, naar - 1)
+    await interaction.response.send_message(f"Nummer verplaatst van {van} naar {naar}.")
+
 @bot.tree.command(name="queue", description="Toon de wachtrij.")
 async def slash_queue(interaction: discord.Interaction):
     queue = get_queue(interaction.guild.id)
@@ -212,40 +556,110 @@ async def slash_queue(interaction: discord.Interaction):
         await interaction.response.send_message("De wachtrij is leeg.")
         return
     embed = discord.Embed(title="🎶 Wachtrij", color=discord.Color.blue())
-    for i, song in enumerate(list(queue)[:20], 1):
-        embed.add_field(name=f"{i}. {song.get('title', 'Onbekend')}", value=f"Gevraagd door: {song.get('requester', 'Onbekend')}", inline=False)
+    for i, song in enumerate(queue.slice(0, 20), 1):
+        embed.add_field(name=f"{i}. {song.title}", value=f"Gevraagd door: {song.requester or 'Onbekend'}", inline=False)
     if len(queue) > 20:
         embed.set_footer(text=f"...en {len(queue) - 20} meer nummers in de wachtrij.")
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="nowplaying", description="Toont het huidige nummer dat wordt afgespeeld.")
 async def slash_nowplaying(interaction: discord.Interaction):
-    queue = get_queue(interaction.guild.id)
-    if not queue:
+    current = current_track(interaction.guild.id)
+    if not current:
         await interaction.response.send_message("Er wordt momenteel niets afgespeeld.")
         return
-    current = queue[0]
-    embed = discord.Embed(title="🎧 Nu aan het spelen", description=current.get("title", "Onbekend"), color=discord.Color.green())
-    embed.add_field(name="Aangevraagd door", value=current.get("requester", "Onbekend"))
-    if "thumbnail" in current and current["thumbnail"]:
-        embed.set_thumbnail(url=current["thumbnail"])
+    embed = discord.Embed(title="🎧 Nu aan het spelen", description=current.title, color=discord.Color.green())
+    embed.add_field(name="Aangevraagd door", value=current.requester or "Onbekend")
+    if current.thumbnail:
+        embed.set_thumbnail(url=current.thumbnail)
     await interaction.response.send_message(embed=embed)
 
+def _format_histogram(histogram):
+    lines = []
+    for label, entry in histogram.summary().items():
+        lines.append(f"{label}: n={entry['count']}, gem {entry['mean'] * 1000:.0f} ms, p95 ≤ {entry['p95'] * 1000:.0f} ms")
+    return "\n".join(lines) or "geen metingen"
+
+
+def _format_ffmpeg_streams():
+    lines = [str(ffmpeg_supervisor.stats())]
+    for entry in ffmpeg_supervisor.stream_stats()[:8]:
+        lines.append(
+            f"{entry['title'][:40]} (pid {entry['pid']}): {entry['cpu_percent']}% CPU, {entry['rss_mib']} MiB, "
+            f"{entry['age_s']} s, {entry['restarts']} herstarts"
+        )
+    return "\n".join(lines)
+
+
+@bot.tree.command(name="stats", description="Toont prestatie- en cachestatistieken van de bot.")
+@app_commands.default_permissions(administrator=True)
+async def slash_stats(interaction: discord.Interaction):
+    embed = discord.Embed(title="📊 Statistieken", color=discord.Color.dark_grey())
+    embed.add_field(name="Extractie", value=_format_histogram(EXTRACT_SECONDS), inline=False)
+    embed.add_field(name="API-aanroepen", value=_format_histogram(API_SECONDS), inline=False)
+    embed.add_field(name="Bron aanmaken", value=_format_histogram(SOURCE_SECONDS), inline=False)
+    embed.add_field(name="Event loop lag", value=_format_histogram(LOOP_LAG_SECONDS), inline=False)
+    embed.add_field(
+        name="Nu",
+        value=(
+            f"Voice-verbindingen: {len(bot.voice_clients)}\n"
+            f"Nummers in wachtrijen: {sum(len(queue) for queue in queue_map.values())}\n"
+            f"FFmpeg-processen: {count_ffmpeg_processes()}\n"
+            f"Geheugen: {rss_bytes() / 2**20:.1f} MiB voor {len(bot.guilds)} guilds "
+            f"({rss_bytes() / max(1, len(bot.guilds)) / 1024:.0f} KiB per guild, profiel {BOT_PROFILE})"
+        ),
+        inline=False,
+    )
+    embed.add_field(name="Trackcache", value=str(track_cache.stats()), inline=False)
+    embed.add_field(name="Single-flight", value=str(extraction_flight.stats()), inline=False)
+    embed.add_field(name="YouTube API", value=str(api_client.stats()), inline=False)
+    embed.add_field(name="Overgangen", value=str(gap_recorder.summary()), inline=False)
+    embed.add_field(name="Now Playing", value=str(now_playing.stats()), inline=False)
+    if audio_cache:
+        embed.add_field(name="Audiocache", value=str(audio_cache.stats()), inline=False)
+    if broadcaster:
+        embed.add_field(name="Broadcast", value=str(broadcaster.stats()), inline=False)
+    if loudness:
+        embed.add_field(name="Loudness", value=str(loudness.stats()), inline=False)
+    embed.add_field(name="FFmpeg", value=_format_ffmpeg_streams(), inline=False)
+    if getattr(bot, "queue_journal", None):
+        embed.add_field(name="Wachtrij-journal", value=str(bot.queue_journal.stats()), inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+first_command_handled = False
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    global first_command_handled
+    # Gemeten vanaf het moment dat Discord de interactie aanmaakte, dus inclusief de netwerkweg heen.
+    elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    COMMAND_SECONDS.observe(elapsed, command.name)
+    if not first_command_handled:
+        first_command_handled = True
+        STARTUP_SECONDS.set(process_uptime())
+        logging.info(f"[STARTUP] Eerste commando (/{command.name}) afgehandeld {STARTUP_SECONDS.value:.2f}s na processtart.")
+
 @bot.event
 async def on_voice_state_update(member, before, after):
+    if member.id == bot.user.id and before.channel and after.channel is None:
+        stop_playback_state(member.guild.id)
+        player = players.pop(member.guild.id, None)
+        if player:
+            player.close()
+        logging.info("Bot heeft het voice channel verlaten; wachtrij en imports gestopt.")
+        return
     voice_client = member.guild.voice_client
-    if voice_client and voice_client.channel and len(voice_client.channel.members) == 1:
+    # voice_states komt rechtstreeks uit de voice-state cache en werkt dus ook zonder member cache.
+    if voice_client and voice_client.channel and len(voice_client.channel.voice_states) == 1:
         await voice_client.disconnect()
-        reset_queue(member.guild.id)
+        stop_playback_state(member.guild.id)
         logging.info("Bot heeft voice channel verlaten omdat iedereen weg is.")
 
 @bot.event
 async def on_ready():
-    print(f"Bot is online als {bot.user}")
-    try:
-        synced = await bot.tree.sync()
-        print(f"Slash commands gesynchroniseerd: {len(synced)}")
-    except Exception as e:
-        print(f"Slash commands sync fout: {e}")
+    print(f"Bot is online als {bot.user} ({process_uptime():.2f}s na processtart)")
 
-bot.run(TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    # Nu nog zonder threads: de extractie-workers forken voordat discord.py en asyncio.to_thread er starten.
+    start_process_pool()
+    bot.run(TOKEN)
@@ -1,8 +1,9 @@
 import os
+import asyncio
 import logging
-import spotipy
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from spotipy.oauth2 import SpotifyClientCredentials
 
 load_dotenv()
 
@@ -11,18 +12,39 @@ SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 
 logger = logging.getLogger(__name__)
 
-if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
-    sp = spotipy.Spotify(
-        auth_manager=SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET,
-        )
-    )
-else:
+SPOTIFY_CONCURRENCY = int(os.getenv("SPOTIFY_CONCURRENCY", "4"))  # gelijktijdige Spotify API-aanroepen
+PLAYLIST_PAGE_SIZE = 100
+ALBUM_PAGE_SIZE = 50
+
+_executor = ThreadPoolExecutor(max_workers=SPOTIFY_CONCURRENCY, thread_name_prefix="spotify")
+
+_client = None
+_client_lock = threading.Lock()
+
+if not (SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET):
     logger.warning(
         "SPOTIFY_CLIENT_ID/SECRET niet ingesteld. Spotify functionaliteit is uitgeschakeld."
     )
-    sp = None
+
+
+def get_spotify_client():
+    """
+    Geeft de Spotify-client terug, of None als er geen credentials zijn.
+    spotipy wordt pas bij het eerste gebruik geïmporteerd, zodat het de opstarttijd niet vertraagt.
+    """
+    global _client
+    if _client is None and SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
+        with _client_lock:
+            if _client is None:
+                import spotipy
+                from spotipy.oauth2 import SpotifyClientCredentials
+                _client = spotipy.Spotify(
+                    auth_manager=SpotifyClientCredentials(
+                        client_id=SPOTIFY_CLIENT_ID,
+                        client_secret=SPOTIFY_CLIENT_SECRET,
+                    )
+                )
+    return _client
 
 def is_spotify_url(url):
     """Controleert of de URL een Spotify-link is."""
@@ -41,6 +63,7 @@ def get_spotify_tracks(url):
     Wordt gebruikt voor YouTube-zoekopdrachten.
     """
     results = []
+    sp = get_spotify_client()
 
     if sp is None:
         logger.warning("Spotify client niet beschikbaar. Sla request over.")
@@ -78,4 +101,66 @@ def get_spotify_tracks(url):
     except Exception as e:
         logger.warning(f"[Spotify] Fout bij ophalen tracks: {e}")
 
-    return results
\ No newline at end of file
+    return results
+
+
+def _track_item(track):
+    """
+    Zet een Spotify track-object om naar een (spotify_id, 'Artiest - Titel') tuple.
+    """
+    return track.get('id'), f"{track['artists'][0]['name']} - {track['name']}"
+
+
+def _page_items(page, content_type):
+    if content_type == 'playlist':
+        tracks = [item.get('track') for item in page.get('items', [])]
+    else:
+        tracks = page.get('items', [])
+    return [_track_item(track) for track in tracks if track and track.get('artists')]
+
+
+async def iter_spotify_items(url):
+    """
+    Async generator die per pagina een lijst van (spotify_id, 'Artiest - Titel') tuples oplevert, in volgorde.
+    Na de eerste pagina is het totaal bekend en worden alle overige pagina's gelijktijdig opgehaald
+    (maximaal SPOTIFY_CONCURRENCY tegelijk).
+    """
+    loop = asyncio.get_running_loop()
+    # De eerste keer importeert dit spotipy; dat gebeurt buiten de event loop.
+    sp = await loop.run_in_executor(_executor, get_spotify_client)
+    if sp is None:
+        logger.warning("Spotify client niet beschikbaar. Sla request over.")
+        return
+
+    if 'track' in url:
+        track = await loop.run_in_executor(_executor, sp.track, url)
+        yield [_track_item(track)]
+        return
+
+    if 'playlist' in url:
+        content_type, page_size = 'playlist', PLAYLIST_PAGE_SIZE
+        spotify_id = extract_spotify_id(url, 'playlist')
+        fetch = sp.playlist_items
+    elif 'album' in url:
+        content_type, page_size = 'album', ALBUM_PAGE_SIZE
+        spotify_id = extract_spotify_id(url, 'album')
+        fetch = sp.album_tracks
+    else:
+        return
+
+    def fetch_page(offset):
+        return fetch(spotify_id, limit=page_size, offset=offset)
+
+    first = await loop.run_in_executor(_executor, fetch_page, 0)
+    yield _page_items(first, content_type)
+
+    pages = [
+        loop.run_in_executor(_executor, fetch_page, offset)
+        for offset in range(page_size, first.get('total', 0), page_size)
+    ]
+    try:
+        for page in pages:
+            yield _page_items(await page, content_type)
+    finally:
+        for page in pages:
+            page.cancel()
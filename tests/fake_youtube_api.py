@@ -0,0 +1,139 @@
+"""
+Lokale stand-in voor de YouTube Data API (playlistItems en videos), zodat de
+metadata-route offline getest kan worden.
+
+Als script:
+    python tests/fake_youtube_api.py --port 8765 --videos 500
+    YOUTUBE_API_BASE_URL=http://127.0.0.1:8765 YOUTUBE_API_KEY=test python3 musicbot.py
+
+Of in code:
+    with FakeYoutubeApi(videos=500) as api:
+        os.environ["YOUTUBE_API_BASE_URL"] = api.base_url
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_video(index):
+    video_id = f"vid{index:08d}"
+    minutes, seconds = divmod(120 + index % 240, 60)
+    return {
+        "id": video_id,
+        "snippet": {
+            "title": f"Nep-nummer {index}",
+            "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+        },
+        "contentDetails": {"duration": f"PT{minutes}M{seconds}S"},
+    }
+
+
+class FakeYoutubeApi:
+    """
+    Draait een HTTP-server op localhost met één playlist van `videos` nummers.
+    `unavailable` bevat indexen van video's die playlistItems wel noemt maar videos.list
+    niet teruggeeft (zoals verwijderde of privé video's). Houdt per endpoint het aantal aanroepen bij.
+    Responses hebben een ETag; een aanvraag met een passende If-None-Match krijgt een 304.
+    """
+
+    def __init__(self, videos=500, unavailable=(), port=0):
+        self.videos = [make_video(i) for i in range(videos)]
+        self.unavailable = {self.videos[i]["id"] for i in unavailable}
+        self.calls = {"playlistItems": 0, "videos": 0}
+        self.not_modified = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _playlist_items(self, params):
+        start = int(params.get("pageToken", "0"))
+        count = min(int(params.get("maxResults", "5")), 50)
+        page = self.videos[start:start + count]
+        data = {
+            "items": [
+                {"snippet": {"title": v["snippet"]["title"], "resourceId": {"videoId": v["id"]}}}
+                for v in page
+            ],
+            "pageInfo": {"totalResults": len(self.videos), "resultsPerPage": count},
+        }
+        if start + count < len(self.videos):
+            data["nextPageToken"] = str(start + count)
+        return data
+
+    def _videos(self, params):
+        ids = params.get("id", "").split(",")[:50]
+        by_id = {v["id"]: v for v in self.videos}
+        return {"items": [by_id[i] for i in ids if i in by_id and i not in self.unavailable]}
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1]
+                if endpoint not in api.calls:
+                    self.send_error(404)
+                    return
+                api.calls[endpoint] += 1
+                data = api._playlist_items(params) if endpoint == "playlistItems" else api._videos(params)
+                body = json.dumps(data).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    api.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--videos", type=int, default=500)
+    args = parser.parse_args()
+
+    api = FakeYoutubeApi(videos=args.videos, port=args.port)
+    print(f"Nep YouTube API op {api.base_url} ({args.videos} video's)")
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
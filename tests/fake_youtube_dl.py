@@ -0,0 +1,54 @@
+"""
+Nep-extractor voor tests en benchmarks zonder netwerk: vervangt yt_dlp.YoutubeDL met instelbare latency.
+"""
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeYoutubeDL:
+    """
+    Vervangt yt_dlp.YoutubeDL: wacht `latency` seconden en geeft een info dict terug zoals yt-dlp dat doet
+    voor een video-link (met stream-URL) of een zoekopdracht (met één entry).
+    """
+
+    latency = 0.05
+    resolve_latency = 0.0  # extra tijd voor het ophalen van formats per volledig geëxtraheerd resultaat
+    duration = 180
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    @classmethod
+    def video_info(cls, video_id):
+        expire = int(time.time()) + 6 * 3600
+        return {
+            "id": video_id,
+            "title": f"Track {video_id}",
+            "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+            "duration": cls.duration,
+            "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+            "url": f"https://rr1.googlevideo.invalid/videoplayback?id={video_id}&expire={expire}",
+            "acodec": "opus",
+            "format_id": "251",
+        }
+
+    def extract_info(self, query, download=False):
+        time.sleep(self.latency)
+        if query.startswith(("http://", "https://")):
+            parsed = urlparse(query)
+            video_id = parse_qs(parsed.query).get("v", [parsed.path.rsplit("/", 1)[-1]])[0]
+            time.sleep(self.resolve_latency)
+            return self.video_info(video_id)
+        prefix, _, text = query.partition(":") if query.startswith("ytsearch") else ("ytsearch", "", query)
+        count = int(prefix[len("ytsearch"):] or 1)
+        video_ids = [f"s{abs(hash((text, i))) % 10 ** 10:010d}" for i in range(count)]
+        if self.opts.get("extract_flat"):
+            # Zoals yt-dlp met extract_flat: alleen wat op de zoekpagina staat, geen formats.
+            entries = [
+                {"id": video_id, "title": f"Track {video_id}", "duration": self.duration,
+                 "url": f"https://www.youtube.com/watch?v={video_id}"}
+                for video_id in video_ids
+            ]
+            return {"id": text, "title": text, "entries": entries}
+        time.sleep(self.resolve_latency * count)
+        return {"id": text, "title": text, "entries": [self.video_info(video_id) for video_id in video_ids]}
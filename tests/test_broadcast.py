@@ -0,0 +1,74 @@
+"""
+Tests voor de Broadcaster: instappositie van een luisteraar en aansluiten bij een net gesloten hub.
+
+Gebruik:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.broadcast import Broadcaster  # noqa: E402
+
+FRAME = b"\0" * 80
+
+
+class FakeSource(discord.AudioSource):
+
+    def __init__(self, frames=1000):
+        self.frames = frames
+        self.cleaned = False
+
+    def read(self):
+        if self.frames <= 0:
+            return b""
+        self.frames -= 1
+        return FRAME
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+class BroadcasterTest(unittest.TestCase):
+
+    def test_listener_reports_join_position(self):
+        broadcaster = Broadcaster(join_window=float("inf"))
+        first = broadcaster.start("nummer", FakeSource())
+        self.assertEqual(first.start_offset, 0)
+        for _ in range(500):
+            first.read()
+        second = broadcaster.join("nummer")
+        self.assertEqual(second.start_offset, 10.0)
+        first.cleanup()
+        second.cleanup()
+
+    def test_default_window_does_not_skip_intro(self):
+        broadcaster = Broadcaster()
+        first = broadcaster.start("nummer", FakeSource())
+        for _ in range(100):
+            first.read()
+        self.assertIsNone(broadcaster.join("nummer"))
+        first.cleanup()
+
+    def test_closed_hub_is_not_joined(self):
+        broadcaster = Broadcaster()
+        first = broadcaster.start("nummer", FakeSource())
+        hub = first.hub
+        hub._on_close = None  # gesloten maar nog niet vergeten
+        first.cleanup()
+        self.assertIsNone(broadcaster.join("nummer"))
+        second = broadcaster.start("nummer", FakeSource())
+        self.assertIsNot(second.hub, hub)
+        self.assertEqual(second.read(), FRAME)
+        second.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests voor de FFmpeg-supervisor met nep-bronnen: in plaats van FFmpeg draait er per bron een `sleep`-proces,
+zodat de limiet, het herstarten van vastgelopen streams en het opruimen van processen echt getest worden.
+
+Gebruik:
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ffmpeg_supervisor  # noqa: E402
+from utils.ffmpeg_supervisor import FFmpegSupervisor, StreamLimitReached  # noqa: E402
+
+FRAME = b"\0" * 3840
+
+
+class FakeFFmpegSource:
+    """
+    Bron met een echt (slapend) proces. Een hangende bron blokkeert in read() tot het proces gekild is;
+    een gewone bron levert `frames` frames en daarna EOF.
+    """
+
+    def __init__(self, hang=False, frames=50):
+        self._process = subprocess.Popen(["sleep", "30"])
+        self.hang = hang
+        self.frames = frames
+
+    def read(self):
+        if self.hang:
+            while self._process.poll() is None:
+                time.sleep(0.01)
+            return b""
+        if self.frames <= 0:
+            return b""
+        self.frames -= 1
+        return FRAME
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+class SupervisorTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.multiple(ffmpeg_supervisor, MONITOR_INTERVAL=0.05, REAP_GRACE=0.1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sources = []
+
+    async def asyncTearDown(self):
+        for source in self.sources:
+            source.cleanup()
+
+    def make_source(self, **kwargs):
+        source = FakeFFmpegSource(**kwargs)
+        self.sources.append(source)
+        return source
+
+    async def wait_until(self, condition, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("voorwaarde niet op tijd waar")
+            await asyncio.sleep(0.02)
+
+    async def test_cap_rejects_and_releases(self):
+        supervisor = FFmpegSupervisor(max_streams=2, queue_timeout=0.1)
+        streams = []
+        for _ in range(2):
+            await supervisor.acquire()
+            streams.append(supervisor.supervise(self.make_source(), "nummer"))
+        with self.assertRaises(StreamLimitReached):
+            await supervisor.acquire()
+        with self.assertRaises(StreamLimitReached):
+            await supervisor.acquire(wait=False)
+        self.assertEqual(supervisor.stats()["rejected"], 2)
+
+        # Cleanup vanuit een andere thread (zoals de audio-thread) geeft de plek vrij aan een wachtende.
+        waiter = asyncio.ensure_future(asyncio.wait_for(supervisor.acquire(), 1))
+        await asyncio.sleep(0.02)
+        threading.Thread(target=streams[0].cleanup).start()
+        await waiter
+        self.assertEqual(supervisor.stats()["queued"], 2)
+        streams[1].cleanup()
+
+    async def test_stalled_stream_restarts_at_position(self):
+        supervisor = FFmpegSupervisor(stall_seconds=0.1)
+        offsets = []
+
+        async def reopen(offset):
+            offsets.append(offset)
+            return self.make_source()
+
+        await supervisor.acquire()
+        stream = supervisor.supervise(self.make_source(hang=True), "nummer", reopen)
+        stream.frames = 100  # al 2 seconden gespeeld
+        data = await asyncio.to_thread(stream.read)
+        self.assertEqual(data, FRAME)
+        self.assertEqual(offsets, [2.0])
+        self.assertEqual(supervisor.stats()["restarted"], 1)
+        stream.cleanup()
+
+    async def test_restart_after_cleanup_discards_new_source(self):
+        supervisor = FFmpegSupervisor(stall_seconds=0.1)
+        reopened = []
+        release = asyncio.Event()
+
+        async def reopen(offset):
+            await release.wait()
+            reopened.append(self.make_source())
+            return reopened[-1]
+
+        await supervisor.acquire()
+        stream = supervisor.supervise(self.make_source(hang=True), "nummer", reopen)
+        reader = asyncio.ensure_future(asyncio.to_thread(stream.read))
+        await self.wait_until(lambda: stream in supervisor._restarting)
+        stream.cleanup()  # skip tijdens het heropenen
+        await reader
+        release.set()
+        await self.wait_until(lambda: not supervisor._restarting)
+        self.assertEqual(len(reopened), 1)
+        self.assertIsNotNone(reopened[0]._process.poll())
+        self.assertEqual(supervisor.stats()["active"], 0)
+
+    async def test_reaper_kills_process_left_after_cleanup(self):
+        supervisor = FFmpegSupervisor()
+        await supervisor.acquire()
+        source = self.make_source()
+        source.cleanup = lambda: None  # een cleanup die het proces laat draaien
+        stream = supervisor.supervise(source, "nummer")
+        stream.cleanup()
+        self.assertEqual(supervisor.stats()["reaping"], 1)
+        await self.wait_until(lambda: supervisor.stats()["reaping"] == 0)
+        self.assertIsNotNone(source._process.poll())
+        self.assertEqual(supervisor.stats()["reaped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
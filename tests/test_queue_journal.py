@@ -0,0 +1,115 @@
+"""
+Tests voor het wachtrij-journal: mutaties vastleggen, "crashen" zonder compactie en opnieuw inladen.
+
+Gebruik:
+    python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import queue_manager  # noqa: E402
+from utils.queue_manager import Track  # noqa: E402
+
+GUILD = 1234
+
+
+def make_tracks(count):
+    return [Track(id=f"vid{i:08d}", title=f"Nummer {i}", duration=300, requester="tester") for i in range(count)]
+
+
+class QueueJournalTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.addCleanup(self.reset_manager)
+        self.reset_manager()
+
+    def reset_manager(self):
+        if queue_manager.journal:
+            queue_manager.journal._lock_handle.close()
+        queue_manager.journal = None
+        for state in (queue_manager.queue_map, queue_manager.looping_map, queue_manager.current_map,
+                      queue_manager.started_map, queue_manager.resume_map):
+            state.clear()
+
+    def crash(self):
+        """
+        Schrijft de buffer weg zoals de achtergrondtaak zou doen en laat het proces daarna "sterven":
+        geen compactie, geen close(). Het geheugen van queue_manager is weg.
+        """
+        journal = queue_manager.journal
+        batch, journal._buffer = journal._buffer, []
+        journal._append(batch)
+        self.reset_manager()
+
+    def restart(self):
+        return queue_manager.enable_journal(self.tmpdir.name)
+
+    def play_some(self):
+        queue_manager.enable_journal(self.tmpdir.name)
+        queue_manager.add_to_queue(GUILD, make_tracks(6))
+        queue_manager.move_in_queue(GUILD, 4, 1)
+        queue_manager.remove_from_queue(GUILD, 5)
+        queue_manager.shuffle_queue(GUILD)
+        current = queue_manager.pop_next_song(GUILD)
+        queue_manager.mark_current(GUILD, current)
+        return current, [track.id for track in queue_manager.get_queue(GUILD)]
+
+    def test_round_trip_after_crash(self):
+        current, queued = self.play_some()
+        started_at = queue_manager.started_map[GUILD]
+        journal_path = queue_manager.journal.journal_path
+        self.crash()
+        # De laatste heartbeat was 42 seconden na de start van het nummer.
+        os.utime(journal_path, (started_at + 42, started_at + 42))
+
+        self.restart()
+        queue = queue_manager.get_queue(GUILD)
+        self.assertEqual([track.id for track in queue], [current.id] + queued)
+        self.assertEqual(queue[0].requester, "tester")
+        self.assertEqual(queue_manager.resume_offset(GUILD, queue[0]), 42)
+        self.assertEqual(queue_manager.resume_offset(GUILD, queue[1]), 0)
+
+        # Zodra het nummer (hervat) start, vervalt de offset.
+        song = queue_manager.pop_next_song(GUILD)
+        queue_manager.mark_current(GUILD, song, 42)
+        self.assertEqual(queue_manager.resume_offset(GUILD, song), 0)
+
+    async def test_records_before_snapshot_are_not_applied_twice(self):
+        current, queued = self.play_some()
+        journal = queue_manager.journal
+        batch, journal._buffer = journal._buffer, []
+        journal._append(batch)
+        with open(journal.journal_path, encoding="utf-8") as f:
+            lines = f.read()
+        await journal._compact()
+        # Crash tussen het wegschrijven van de snapshot en het legen van het journal.
+        with open(journal.journal_path, "w", encoding="utf-8") as f:
+            f.write(lines)
+        queue_manager.add_to_queue(GUILD, [Track(id="naderhand")])
+        self.crash()
+
+        self.restart()
+        self.assertEqual([track.id for track in queue_manager.get_queue(GUILD)],
+                         [current.id] + queued + ["naderhand"])
+
+    def test_torn_last_line_is_skipped(self):
+        current, queued = self.play_some()
+        journal_path = queue_manager.journal.journal_path
+        self.crash()
+        record = json.dumps([999, "add", GUILD, [[Track(id="half").to_queue_dict()]]])
+        with open(journal_path, "a", encoding="utf-8") as f:
+            f.write(record[:len(record) // 2])
+
+        self.restart()
+        self.assertEqual([track.id for track in queue_manager.get_queue(GUILD)], [current.id] + queued)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Gedragstests voor youtube_handler zonder netwerk: yt-dlp wordt vervangen door FakeYoutubeDL
+en de YouTube Data API door de lokale FakeYoutubeApi (beide in tests/).
+
+Gebruik:
+    python -m unittest discover tests
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fake_youtube_api import FakeYoutubeApi  # noqa: E402
+from tests.fake_youtube_dl import FakeYoutubeDL  # noqa: E402
+from utils.extract_pool import ExtractPool  # noqa: E402
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLtest"
+VIDEOS = 120
+UNAVAILABLE = (3, 61)
+
+api = None
+tmpdir = None
+youtube_handler = None
+
+
+class SlowFirstYoutubeDL(FakeYoutubeDL):
+    """
+    Eerdere video's zijn trager klaar dan latere, zodat de volgorde van afronden omgekeerd is.
+    """
+
+    def extract_info(self, query, download=False):
+        index = int(query.rsplit("=", 1)[-1][len("vid"):])
+        time.sleep(0.02 * (5 - index))
+        return self.video_info(f"vid{index:08d}")
+
+
+def setUpModule():
+    global api, tmpdir, youtube_handler
+    api = FakeYoutubeApi(videos=VIDEOS, unavailable=UNAVAILABLE).start()
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "YOUTUBE_API_KEY": "test",
+        "YOUTUBE_API_BASE_URL": api.base_url,
+        "CACHE_DB_PATH": os.path.join(tmpdir.name, "cache.sqlite3"),
+        "HTTP_CACHE_PATH": os.path.join(tmpdir.name, "http_cache.sqlite3"),
+    })
+    youtube_handler = importlib.import_module("youtube_handler")
+
+
+def tearDownModule():
+    api.stop()
+    tmpdir.cleanup()
+
+
+class ExtractTracksTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        youtube_handler._extract_pool = ExtractPool(youtube_handler.YDL_OPTS, max_workers=5,
+                                                    ydl_factory=SlowFirstYoutubeDL)
+
+    async def asyncTearDown(self):
+        youtube_handler._extract_pool.close()
+        youtube_handler._extract_pool = None
+
+    async def test_results_follow_input_order(self):
+        queries = [f"https://www.youtube.com/watch?v=vid{i:08d}" for i in range(5)]
+        results = await youtube_handler.extract_tracks(queries)
+        self.assertEqual([query for query, _, _ in results], queries)
+        self.assertEqual([tracks[0].id for _, tracks, _ in results], [f"vid{i:08d}" for i in range(5)])
+
+    async def test_cached_and_extracted_results_keep_order(self):
+        first = [f"https://www.youtube.com/watch?v=vid{i:08d}" for i in (1, 3)]
+        await youtube_handler.extract_tracks(first)
+        queries = [f"https://www.youtube.com/watch?v=vid{i:08d}" for i in (4, 3, 0, 1, 4)]
+        results = await youtube_handler.extract_tracks(queries)
+        self.assertEqual([tracks[0].id for _, tracks, _ in results], [f"vid{i:08d}" for i in (4, 3, 0, 1, 4)])
+
+
+class PlaylistMetadataTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        # De aiohttp-sessie hoort bij de event loop van deze test.
+        if youtube_handler.api_client._session is not None:
+            await youtube_handler.api_client._session.close()
+            youtube_handler.api_client._session = None
+
+    async def collect(self):
+        batches = [batch async for batch in youtube_handler.iter_playlist_tracks(PLAYLIST_URL)]
+        return batches, [track for batch in batches for track in batch]
+
+    async def test_playlist_order_and_unavailable_videos(self):
+        batches, tracks = await self.collect()
+        self.assertEqual(len(batches[0]), 1)
+        expected = [f"vid{i:08d}" for i in range(VIDEOS) if i not in UNAVAILABLE]
+        self.assertEqual([track.id for track in tracks], expected)
+
+    async def test_metadata_mapping(self):
+        _, tracks = await self.collect()
+        track = next(track for track in tracks if track.id == "vid00000007")
+        self.assertEqual(track.title, "Nep-nummer 7")
+        self.assertEqual(track.duration, 127)
+        self.assertEqual(track.thumbnail, "https://i.ytimg.com/vi/vid00000007/hqdefault.jpg")
+        self.assertEqual(track.webpage_url, "https://www.youtube.com/watch?v=vid00000007")
+
+
+
+class DurationTest(unittest.TestCase):
+
+    def test_iso8601_durations(self):
+        parse = youtube_handler.parse_iso8601_duration
+        self.assertEqual(parse("PT1H2M3S"), 3723)
+        self.assertEqual(parse("P1DT1S"), 86401)
+        self.assertEqual(parse("PT45S"), 45)
+        self.assertEqual(parse("P0D"), 0)
+        self.assertEqual(parse(None), 0)
+        self.assertEqual(parse("onzin"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+OPUS_EXTENSIONS = (".webm", ".opus", ".ogg")
+
+
+def _default_downloader(url, directory):
+    """
+    Downloadt de audio (bij voorkeur de originele webm/opus) van een video naar directory
+    en geeft (pad, acodec) terug.
+    """
+    import yt_dlp
+    opts = {
+        'format': 'bestaudio[acodec=opus]/bestaudio',
+        'quiet': True,
+        'noplaylist': True,
+        'outtmpl': os.path.join(directory, '%(id)s.%(ext)s'),
+    }
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=True)
+        return ydl.prepare_filename(info), info.get('acodec')
+
+
+class AudioCache:
+    """
+    Optionele schijfcache met audiobestanden van vaak gespeelde nummers.
+    Een nummer wordt na `min_plays` keer afspelen op de achtergrond gedownload; daarna speelt de bot
+    het lokale bestand af in plaats van opnieuw te streamen. De totale grootte blijft onder `max_bytes`
+    door de minst recent gespeelde bestanden te verwijderen (LRU).
+    """
+
+    def __init__(self, directory, max_bytes, min_plays=3, downloader=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._downloader = downloader or _default_downloader
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-cache")
+        self._downloading = set()
+
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite3"))
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS plays (
+                video_id TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                video_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                acodec TEXT,
+                last_used REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def lookup(self, video_id):
+        """
+        Geeft (pad, acodec) van het lokale bestand terug, of None als het nummer niet in de cache staat.
+        """
+        row = self._db.execute("SELECT path, size, acodec FROM files WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            if row is not None:
+                self._db.execute("DELETE FROM files WHERE video_id = ?", (video_id,))
+                self._db.commit()
+            self.misses += 1
+            return None
+        self._db.execute("UPDATE files SET last_used = ? WHERE video_id = ?", (time.time(), video_id))
+        self._db.commit()
+        self.hits += 1
+        self.bytes_saved += row[1]
+        return row[0], row[2]
+
+    def peek(self, video_id):
+        """
+        Zoals lookup, maar zonder bijwerkingen: telt geen hit, bespaarde bytes of gebruik voor de LRU.
+        Voor achtergrondtaken zoals de loudness-meting.
+        """
+        row = self._db.execute("SELECT path FROM files WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None
+        return row[0]
+
+    def record_play(self, track):
+        """
+        Telt een keer afspelen en start de download zodra het nummer vaak genoeg gespeeld is.
+        """
+        self._db.execute(
+            "INSERT INTO plays VALUES (?, 1) ON CONFLICT(video_id) DO UPDATE SET count = count + 1",
+            (track.id,),
+        )
+        self._db.commit()
+        (count,) = self._db.execute("SELECT count FROM plays WHERE video_id = ?", (track.id,)).fetchone()
+        if count < self.min_plays or track.id in self._downloading:
+            return
+        if self._db.execute("SELECT 1 FROM files WHERE video_id = ?", (track.id,)).fetchone():
+            return
+        self._downloading.add(track.id)
+        asyncio.ensure_future(self._download(track))
+
+    async def _download(self, track):
+        loop = asyncio.get_running_loop()
+        try:
+            path, acodec = await loop.run_in_executor(self._executor, self._downloader, track.webpage_url, self.directory)
+            size = os.path.getsize(path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (track.id, path, size, acodec, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+            logger.info(f"[AUDIO CACHE] '{track.title}' opgeslagen ({size // 1024} KiB).")
+        except Exception as e:
+            logger.warning(f"[AUDIO CACHE] Download van '{track.title}' mislukt: {e}")
+        finally:
+            self._downloading.discard(track.id)
+
+    def _evict(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()
+        if total <= self.max_bytes:
+            return
+        for video_id, path, size in self._db.execute(
+            "SELECT video_id, path, size FROM files ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM files WHERE video_id = ?", (video_id,))
+            total -= size
+
+    def stats(self):
+        (files, total) = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "files": files,
+            "bytes": total,
+        }
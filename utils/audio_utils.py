@@ -1,26 +1,59 @@
-from discord import FFmpegPCMAudio
+import weakref
+
+from discord import FFmpegOpusAudio, FFmpegPCMAudio
 
 FFMPEG_BEFORE_OPTS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
 FFMPEG_OPTS = '-vn'
 
+# Alle aangemaakte FFmpeg-bronnen, zodat metrics kunnen tellen hoeveel processen er nog draaien.
+_live_sources = weakref.WeakSet()
+
+
+def get_ffmpeg_audio_source(stream_url: str, codec: str = None, gain_db: float = None, start_seconds: float = None):
+    """
+    Maakt een audiobron aan voor een stream-URL of een lokaal bestand.
+    Is de stream al Opus (webm/opus van yt-dlp), dan worden de pakketten ongewijzigd doorgegeven
+    met FFmpegOpusAudio. Andere codecs worden via FFmpegPCMAudio gedecodeerd en door discord.py opnieuw gecodeerd.
+    Met gain_db wordt een vaste volume-aanpassing toegepast; dat vraagt decoderen, dus dan geen passthrough.
+    Met start_seconds begint FFmpeg verderop in het nummer (bij het herstarten van een vastgelopen stream).
+    """
+    # Lokale bestanden (uit de audiocache) hebben geen reconnect-opties nodig.
+    before_options = FFMPEG_BEFORE_OPTS if stream_url.startswith(("http://", "https://")) else None
+    if start_seconds:
+        before_options = f"{before_options or ''} -ss {start_seconds:.2f}".strip()
+    options = f"{FFMPEG_OPTS} -af volume={gain_db}dB" if gain_db else FFMPEG_OPTS
+    if codec == "opus" and not gain_db:
+        source = FFmpegOpusAudio(
+            stream_url,
+            codec="copy",
+            before_options=before_options,
+            options=options
+        )
+    else:
+        source = FFmpegPCMAudio(
+            stream_url,
+            before_options=before_options,
+            options=options
+        )
+    _live_sources.add(source)
+    return source
+
 
-def get_ffmpeg_audio_source(stream_url: str) -> FFmpegPCMAudio:
+def count_ffmpeg_processes() -> int:
     """
-    Maakt een FFmpegPCMAudio object aan voor een stream-URL.
-    Dit wordt gebruikt om audio te streamen naar een Discord voice channel.
+    Telt de FFmpeg-processen van deze bot die nog draaien.
     """
-    return FFmpegPCMAudio(
-        stream_url,
-        before_options=FFMPEG_BEFORE_OPTS,
-        options=FFMPEG_OPTS
+    return sum(
+        1 for source in list(_live_sources)
+        if getattr(source, "_process", None) is not None and source._process.poll() is None
     )
 
 
-def play_stream(voice_client, stream_url: str, after=None):
+def play_stream(voice_client, stream_url: str, after=None, codec: str = None):
     """
     Speelt een audiostream af in het opgegeven voice channel.
     """
-    source = get_ffmpeg_audio_source(stream_url)
+    source = get_ffmpeg_audio_source(stream_url, codec)
     voice_client.play(source, after=after)
 
 
@@ -0,0 +1,175 @@
+import bisect
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+AUTOCOMPLETE_MAX_ENTRIES = int(os.getenv("AUTOCOMPLETE_MAX_ENTRIES", "20000"))
+AUTOCOMPLETE_GUILD_RECENT = 200   # recent gekozen nummers die per guild voorrang krijgen
+MAX_CHOICES = 25                  # maximum van Discord per autocomplete-antwoord
+SCAN_LIMIT = 500                  # maximaal aantal prefix-treffers dat gerangschikt wordt
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_title(text):
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def watch_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+class TitleIndex:
+    """
+    Prefixindex op titels voor /play autocomplete, volledig in het geheugen.
+    Per titel staat elke woordpositie als sleutel in een gesorteerde lijst, zodat "gonna give"
+    ook "Never Gonna Give You Up" vindt; een zoekopdracht is één bisect plus een korte scan.
+    Treffers die de guild recent gebruikte komen eerst, daarna de vaakst gespeelde.
+    """
+
+    def __init__(self, path=None, max_entries=AUTOCOMPLETE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._keys = []      # gesorteerde lijst van (sleutel, video_id)
+        self._entries = {}   # video_id → [titel, aantal keer toegevoegd, laatst gebruikt]
+        self._guilds = {}    # guild_id → {video_id: laatst gebruikt}, begrensd
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _suffix_keys(self, video_id, title):
+        words = normalize_title(title).split()
+        return {(" ".join(words[i:]), video_id) for i in range(len(words))}
+
+    def add(self, video_id, title, guild_id=None, uses=1, last_used=None):
+        """
+        Voegt een nummer toe of verhoogt het gebruik ervan, globaal en (optioneel) voor een guild.
+        """
+        if not video_id or not title:
+            return
+        now = last_used or time.time()
+        entry = self._entries.get(video_id)
+        if entry is None:
+            for key in self._suffix_keys(video_id, title):
+                bisect.insort(self._keys, key)
+            self._entries[video_id] = [title, uses, now]
+            if len(self._entries) > self.max_entries:
+                self._evict()
+        else:
+            entry[1] += uses
+            entry[2] = max(entry[2], now)
+        if guild_id is not None:
+            recent = self._guilds.setdefault(guild_id, {})
+            recent.pop(video_id, None)
+            recent[video_id] = now
+            if len(recent) > AUTOCOMPLETE_GUILD_RECENT:
+                del recent[next(iter(recent))]
+        self.dirty = True
+
+    def add_tracks(self, tracks, guild_id=None):
+        """
+        Voegt een batch nummers toe. Bij grote batches (playlists) worden de nieuwe sleutels in één keer
+        achteraan gezet en wordt de lijst opnieuw gesorteerd; timsort doet dat in lineaire tijd.
+        """
+        new = [t for t in tracks if t.id and t.title and t.id not in self._entries]
+        if len(new) > 16:
+            now = time.time()
+            for track in new:
+                self._keys.extend(self._suffix_keys(track.id, track.title))
+                self._entries[track.id] = [track.title, 0, now]
+            self._keys.sort()
+            if len(self._entries) > self.max_entries:
+                self._evict()
+        for track in tracks:
+            self.add(track.id, track.title, guild_id)
+
+    def _evict(self):
+        # Verwijder de 10% minst recent gebruikte nummers in één keer, zodat dit zelden gebeurt.
+        count = max(1, len(self._entries) // 10)
+        oldest = sorted(self._entries, key=lambda video_id: self._entries[video_id][2])[:count]
+        removed = set(oldest)
+        for video_id in oldest:
+            del self._entries[video_id]
+        self._keys = [key for key in self._keys if key[1] not in removed]
+
+    def search(self, text, guild_id=None, limit=MAX_CHOICES):
+        """
+        Geeft maximaal `limit` (titel, video_id) tuples terug die met `text` beginnen op een woordgrens.
+        Zonder tekst: de recent gebruikte nummers van de guild.
+        """
+        recent = self._guilds.get(guild_id, {})
+        prefix = normalize_title(text)
+        if not prefix:
+            ids = list(reversed(recent))[:limit]
+            return [(self._entries[video_id][0], video_id) for video_id in ids if video_id in self._entries]
+
+        start = bisect.bisect_left(self._keys, (prefix, ""))
+        matches = set()
+        for key, video_id in self._keys[start:start + SCAN_LIMIT]:
+            if not key.startswith(prefix):
+                break
+            matches.add(video_id)
+
+        def rank(video_id):
+            title, uses, last_used = self._entries[video_id]
+            return (recent.get(video_id, 0), uses, last_used)
+
+        best = sorted(matches, key=rank, reverse=True)[:limit]
+        return [(self._entries[video_id][0], video_id) for video_id in best]
+
+    def load(self, seed_tracks=()):
+        """
+        Laadt de index uit `path`. Bestaat dat bestand nog niet, dan wordt hij gevuld met `seed_tracks`
+        (bijvoorbeeld de recent gebruikte tracks uit de TrackCache).
+        """
+        if not self.path or not os.path.exists(self.path):
+            now = time.time()
+            self._bulk_load((track.id, [track.title, 1, now]) for track in seed_tracks if track.id and track.title)
+            logger.info(f"[AUTOCOMPLETE] Index opgebouwd uit de cache: {len(self)} nummers.")
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[AUTOCOMPLETE] Index kon niet geladen worden: {e}")
+            return
+
+        self._bulk_load(data.get("entries", {}).items())
+        for guild_id, ids in data.get("guilds", {}).items():
+            self._guilds[int(guild_id)] = {video_id: last_used for video_id, last_used in ids}
+        self.dirty = False
+        logger.info(f"[AUTOCOMPLETE] Index geladen: {len(self)} nummers.")
+
+    def _bulk_load(self, entries):
+        # Eén keer sorteren is veel sneller dan per nummer insort bij een warme start.
+        for video_id, entry in entries:
+            self._entries.setdefault(video_id, entry)
+        self._keys = sorted(
+            key for video_id, entry in self._entries.items() for key in self._suffix_keys(video_id, entry[0])
+        )
+
+    def snapshot(self):
+        """
+        Kopie van de inhoud die veilig in een andere thread weggeschreven kan worden.
+        """
+        self.dirty = False
+        return {
+            "entries": {video_id: list(entry) for video_id, entry in self._entries.items()},
+            "guilds": {str(guild_id): list(recent.items()) for guild_id, recent in self._guilds.items()},
+        }
+
+    def write(self, snapshot):
+        """
+        Schrijft een snapshot atomair weg (eerst naar een tijdelijk bestand, dan vervangen).
+        """
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
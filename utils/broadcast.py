@@ -0,0 +1,176 @@
+import logging
+import threading
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.02   # discord.py leest elke 20 ms één frame
+BUFFER_FRAMES = 250    # 5 seconden speling tussen de snelste en de traagste guild
+
+
+class BroadcastHub:
+    """
+    Eén gedeelde decode/encode-pijplijn voor een nummer dat in meerdere guilds speelt.
+    De bron wordt één keer gelezen (en zo nodig één keer naar Opus gecodeerd); elke guild
+    krijgt een BroadcastListener die dezelfde Opus-frames uit een ringbuffer leest.
+    De audio-thread die als eerste een nieuw frame nodig heeft, leest het uit de bron.
+    """
+
+    def __init__(self, key, source, on_close=None):
+        self.key = key
+        self._source = source
+        self._encoder = None if source.is_opus() else discord.opus.Encoder()
+        self._on_close = on_close
+        self._lock = threading.Lock()
+        self._frames = deque()   # Opus-frames vanaf index self._base
+        self._base = 0
+        self._ended = False
+        self._closed = False
+        self.listeners = 0
+
+    @property
+    def head(self):
+        """
+        Index van het volgende frame dat uit de bron gelezen wordt.
+        """
+        return self._base + len(self._frames)
+
+    @property
+    def position(self):
+        """
+        Huidige positie in het nummer, in seconden.
+        """
+        return self.head * FRAME_SECONDS
+
+    def frame(self, index):
+        """
+        Geeft het Opus-frame op de opgegeven index terug, samen met de index waar het echt vandaan kwam.
+        Een luisteraar die achter de buffer is geraakt springt naar het oudste beschikbare frame.
+        Een lege bytes betekent dat het nummer afgelopen is.
+        """
+        with self._lock:
+            index = max(index, self._base)
+            while index >= self.head and not self._ended:
+                data = self._source.read()
+                if not data:
+                    self._ended = True
+                    break
+                if self._encoder is not None:
+                    data = self._encoder.encode(data, self._encoder.SAMPLES_PER_FRAME)
+                self._frames.append(data)
+                if len(self._frames) > BUFFER_FRAMES:
+                    self._frames.popleft()
+                    self._base += 1
+            if index >= self.head:
+                return b"", index
+            return self._frames[index - self._base], index
+
+    def listen(self):
+        """
+        Geeft een luisteraar die bij het huidige frame instapt, of None als de hub al gesloten is.
+        """
+        with self._lock:
+            if self._closed:
+                return None
+            self.listeners += 1
+            return BroadcastListener(self, self.head)
+
+    def release(self):
+        with self._lock:
+            self.listeners -= 1
+            if self.listeners > 0 or self._closed:
+                return
+            self._closed = True
+        self._source.cleanup()
+        if self._on_close:
+            self._on_close(self)
+
+
+class BroadcastListener(discord.AudioSource):
+    """
+    Audiobron voor één guild die meeleest met een BroadcastHub. Begint bij het frame dat de hub
+    produceerde toen de guild instapte; start_offset is die positie in seconden, zodat de speler
+    (voortgangsbalk, journal, prewarm) weet dat het nummer niet bij 0:00 begint.
+    """
+
+    def __init__(self, hub, index):
+        self.hub = hub
+        self._index = index
+        self.start_offset = index * FRAME_SECONDS
+        self._released = False
+
+    def read(self):
+        data, index = self.hub.frame(self._index)
+        self._index = index + 1
+        return data
+
+    def is_opus(self):
+        return True
+
+    def cleanup(self):
+        if not self._released:
+            self._released = True
+            self.hub.release()
+
+
+class Broadcaster:
+    """
+    Houdt per nummer (video-id) de actieve BroadcastHub bij. Een guild die hetzelfde nummer
+    start terwijl het ergens anders nog niet verder dan `join_window` seconden is, luistert mee
+    in plaats van een eigen FFmpeg-proces te starten. Standaard is dat venster klein, zodat niemand
+    het begin van een aangevraagd nummer mist; met join_window = inf werkt het als radio.
+    """
+
+    def __init__(self, join_window=0.5):
+        self.join_window = join_window
+        self._hubs = {}
+        self._lock = threading.Lock()
+        self.shared_joins = 0
+
+    def join(self, key):
+        """
+        Geeft een luisteraar voor een lopende hub terug, of None als er geen geschikte is.
+        De positie waarop de luisteraar instapt staat in listener.start_offset.
+        """
+        with self._lock:
+            hub = self._hubs.get(key)
+            if hub is None or hub.position > self.join_window:
+                return None
+            # Een hub die net gesloten is maar nog niet vergeten geeft None.
+            listener = hub.listen()
+            if listener is not None:
+                self.shared_joins += 1
+            return listener
+
+    def start(self, key, source):
+        """
+        Start een nieuwe hub voor deze bron (of sluit aan bij een hub die net tegelijk gestart is)
+        en geeft een luisteraar terug, met de instappositie in listener.start_offset.
+        """
+        with self._lock:
+            hub = self._hubs.get(key)
+            listener = hub.listen() if hub is not None and hub.position <= self.join_window else None
+            if listener is not None:
+                self.shared_joins += 1
+            else:
+                hub = self._hubs[key] = BroadcastHub(key, source, on_close=self._forget)
+                source = None
+                listener = hub.listen()
+        if source is not None:
+            source.cleanup()
+        return listener
+
+    def _forget(self, hub):
+        with self._lock:
+            if self._hubs.get(hub.key) is hub:
+                del self._hubs[hub.key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hubs": len(self._hubs),
+                "listeners": sum(hub.listeners for hub in self._hubs.values()),
+                "shared_joins": self.shared_joins,
+            }
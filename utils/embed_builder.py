@@ -1,20 +1,37 @@
 import discord
 from utils.audio_utils import format_duration, make_progress_bar
-from utils.queue_manager import queue_length, get_total_duration
+from utils.queue_manager import Track, queue_length, get_total_duration
 
 
-async def send_now_playing(ctx, song: dict) -> discord.Message:
+def build_added_embed(track: Track, requester: str, queue) -> discord.Embed:
+    """
+    Bouwt de embed die getoond wordt als er een nummer aan de wachtrij is toegevoegd.
+    """
+    total_duration = queue.total_duration
+
+    embed = discord.Embed(title="🎶 Nummer toegevoegd", color=discord.Color.blurple())
+    embed.add_field(name="Song", value=track.title, inline=False)
+    embed.add_field(name="Requester", value=requester, inline=True)
+    embed.add_field(name="Tijd", value=f"{track.duration // 60}:{track.duration % 60:02} min", inline=True)
+    embed.add_field(name="Totale wachtrij nummers", value=str(len(queue)), inline=True)
+    embed.add_field(name="Totale wachtrij tijd", value=f"{total_duration // 60}:{total_duration % 60:02} min", inline=True)
+    if track.thumbnail:
+        embed.set_thumbnail(url=track.thumbnail)
+    return embed
+
+
+async def send_now_playing(ctx, song: Track) -> discord.Message:
     """
     Stuurt een embed met nummerinformatie, inclusief aanvrager en wachtrijtijd.
     """
-    duration = song.get("duration", 1)
+    duration = song.duration or 1
     total_tracks = queue_length(ctx.guild.id)
     total_remaining = get_total_duration(ctx.guild.id)
-    requester = song.get("requester", "Onbekend")
+    requester = song.requester or "Onbekend"
 
     embed = discord.Embed(
         title="Now Playing",
-        description=f"[{song['title']}]({song['webpage_url']})"
+        description=f"[{song.title}]({song.webpage_url})"
     )
 
     embed.add_field(name="Aangevraagd door", value=requester, inline=True)
@@ -25,17 +42,17 @@ async def send_now_playing(ctx, song: dict) -> discord.Message:
         inline=True
     )
 
-    if thumbnail := song.get("thumbnail"):
+    if thumbnail := song.thumbnail:
         embed.set_thumbnail(url=thumbnail)
 
     return await ctx.send(embed=embed)
 
 
-async def update_progress_bar(message: discord.Message, song: dict, elapsed: int):
+async def update_progress_bar(message: discord.Message, song: Track, elapsed: int):
     """
     Werkt de originele 'Now Playing' embed bij met een voortgangsbalk en verstreken tijd.
     """
-    duration = song.get("duration", 1)
+    duration = song.duration or 1
     progress_bar = make_progress_bar(elapsed, duration)
 
     # Haal de eerste embed op en werk de beschrijving bij
@@ -44,7 +61,7 @@ async def update_progress_bar(message: discord.Message, song: dict, elapsed: int
 
     embed = message.embeds[0]
     embed.description = (
-        f"[{song['title']}]({song['webpage_url']})\n"
+        f"[{song.title}]({song.webpage_url})\n"
         f"{progress_bar} {format_duration(elapsed)} / {format_duration(duration)}"
     )
 
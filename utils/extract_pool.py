@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.metrics import EXTRACT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Resultaat per query: info is None als de extractie mislukt is, error bevat dan de reden.
+ExtractResult = namedtuple("ExtractResult", ["query", "info", "error"])
+
+# Velden uit de yt-dlp info dict die de bot gebruikt; de rest (zoals de formats-lijst) valt weg.
+TRACK_FIELDS = ("id", "title", "webpage_url", "duration", "thumbnail", "url", "acodec", "format_id")
+
+
+def _default_ydl_factory(ydl_opts):
+    import yt_dlp
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
+def compact_info(info):
+    """
+    Verkleint een yt-dlp info dict tot TRACK_FIELDS (recursief voor playlist-entries),
+    zodat het resultaat goedkoop tussen processen te versturen en te bewaren is.
+    """
+    if info is None:
+        return None
+    compact = {field: info[field] for field in TRACK_FIELDS if info.get(field) is not None}
+    entries = info.get("entries")
+    if entries is not None:
+        compact["entries"] = [compact_info(entry) for entry in entries]
+    return compact
+
+
+class ExtractPool:
+    """
+    Voert yt-dlp extracties parallel uit met een begrensd aantal workers.
+    Elke worker-thread krijgt een eigen YoutubeDL instantie, omdat één instantie
+    niet veilig gedeeld kan worden tussen threads.
+    """
+
+    def __init__(self, ydl_opts, max_workers=4, ydl_factory=None):
+        self.ydl_opts = ydl_opts
+        self.max_workers = max_workers
+        self._ydl_factory = ydl_factory or _default_ydl_factory
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ytdl")
+
+    def _get_ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._ydl_factory(self.ydl_opts)
+            self._local.ydl = ydl
+        return ydl
+
+    def _extract_sync(self, query):
+        return compact_info(self._get_ydl().extract_info(query, download=False))
+
+    async def extract(self, query):
+        """
+        Extraheert één query op een worker.
+        """
+        loop = asyncio.get_running_loop()
+        with EXTRACT_SECONDS.time("thread"):
+            return await loop.run_in_executor(self._executor, self._extract_sync, query)
+
+    async def extract_result(self, query):
+        """
+        Extraheert één query en vangt fouten af, zodat het resultaat per item gerapporteerd kan worden.
+        """
+        try:
+            info = await self.extract(query)
+        except Exception as e:
+            return ExtractResult(query, None, e)
+        if info is None:
+            return ExtractResult(query, None, LookupError("Geen info gevonden"))
+        return ExtractResult(query, info, None)
+
+    async def extract_many(self, queries):
+        """
+        Extraheert alle queries gelijktijdig (maximaal max_workers tegelijk).
+        Geeft een lijst ExtractResult terug in dezelfde volgorde als de queries.
+        """
+        return list(await asyncio.gather(*(self.extract_result(q) for q in queries)))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_worker_ydl = None  # YoutubeDL instantie van het huidige worker-proces
+
+
+def _init_process_worker(ydl_opts, ydl_factory):
+    global _worker_ydl
+    _worker_ydl = (ydl_factory or _default_ydl_factory)(ydl_opts)
+
+
+def _process_extract(query):
+    return compact_info(_worker_ydl.extract_info(query, download=False))
+
+
+def _process_ping():
+    return None
+
+
+class ProcessExtractPool(ExtractPool):
+    """
+    ExtractPool die yt-dlp in aparte processen draait, zodat het parsen de GIL
+    van de event loop niet vasthoudt. Elk worker-proces houdt één YoutubeDL instantie
+    zijn hele levensduur aan en stuurt alleen compacte track-gegevens terug.
+
+    De workers worden geforkt, dus maak de pool aan voordat er threads draaien (zie
+    youtube_handler.start_process_pool): een fork in een proces met threads kan vastlopen op een lock
+    die een andere thread vasthield. 'spawn' en 'forkserver' importeren musicbot.py opnieuw in elke worker,
+    met al zijn bijwerkingen, en vallen daarom af.
+    """
+
+    def __init__(self, ydl_opts, max_workers=4, ydl_factory=None):
+        self.ydl_opts = ydl_opts
+        self.max_workers = max_workers
+        if threading.active_count() > 1:
+            logger.warning(
+                f"[YT-DLP] Process-pool wordt geforkt terwijl er {threading.active_count()} threads draaien; "
+                "maak hem aan vóór het starten van de bot."
+            )
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_process_worker,
+            initargs=(ydl_opts, ydl_factory),
+        )
+        # Met 'fork' start de eerste submit alle workers, nog voordat de beheerthread van de pool bestaat.
+        for _ in range(max_workers):
+            self._executor.submit(_process_ping)
+
+    async def extract(self, query):
+        loop = asyncio.get_running_loop()
+        with EXTRACT_SECONDS.time("process"):
+            return await loop.run_in_executor(self._executor, _process_extract, query)
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_MAX_STREAMS = int(os.getenv("FFMPEG_MAX_STREAMS", "0"))         # 0 = geen limiet
+FFMPEG_QUEUE_TIMEOUT = float(os.getenv("FFMPEG_QUEUE_TIMEOUT", "30"))  # seconden wachten op een vrije plek, 0 = meteen weigeren
+FFMPEG_STALL_SECONDS = float(os.getenv("FFMPEG_STALL_SECONDS", "10"))  # zo lang geen audio = vastgelopen
+MAX_RESTARTS = 2              # herstarts per stream, daarna wordt het nummer afgebroken
+MONITOR_INTERVAL = 2.0
+REAP_GRACE = 2.0              # seconden na cleanup voordat een nog levend proces gekild wordt
+FRAME_SECONDS = 0.02
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS, PAGE_SIZE = 100, 4096
+
+
+class StreamLimitReached(Exception):
+    """
+    Er draaien al FFMPEG_MAX_STREAMS streams en er kwam op tijd geen plek vrij.
+    """
+
+
+def _process_usage(pid):
+    """
+    Geeft (cpu-seconden, rss-bytes) van een proces terug uit /proc, of None als dat niet lukt.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, rss_pages * PAGE_SIZE
+
+
+class SupervisedSource(discord.AudioSource):
+    """
+    Doorgeefluik om een FFmpeg-bron heen dat bijhoudt of er nog audio uitkomt.
+    De supervisor kan de onderliggende bron vervangen (herstart op dezelfde positie);
+    read() in de audio-thread merkt dat vanzelf en leest verder uit de nieuwe bron.
+    """
+
+    def __init__(self, supervisor, inner, title, restart):
+        self._supervisor = supervisor
+        self._inner = inner
+        self._reopen = restart           # async functie: offset in seconden → nieuwe FFmpeg-bron, of None
+        self.title = title
+        self.started = time.monotonic()
+        self.frames = 0
+        self.reading_since = None        # monotonic tijd waarop een nog lopende read() begon
+        self.last_output = self.started
+        self.restarts = 0
+        self.cpu = None                  # (cpu-seconden, meetmoment) van de vorige meting
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.closed = False
+
+    @property
+    def process(self):
+        return getattr(self._inner, "_process", None)
+
+    def read(self):
+        inner = self._inner
+        self.reading_since = time.monotonic()
+        data = inner.read()
+        if not data and self._inner is not inner:
+            # Vervangen tijdens het lezen: de oude bron gaf EOF omdat hij gekild is.
+            data = self._inner.read()
+        self.reading_since = None
+        if data:
+            self.frames += 1
+            self.last_output = time.monotonic()
+        return data
+
+    def is_opus(self):
+        return self._inner.is_opus()
+
+    def cleanup(self):
+        # Onder de lock van de supervisor, zodat een herstart niet tegelijk een nieuwe bron kan inzetten.
+        with self._supervisor._lock:
+            if self.closed:
+                return
+            self.closed = True
+            inner = self._inner
+        inner.cleanup()
+        self._supervisor._release_threadsafe(self)
+
+
+class FFmpegSupervisor:
+    """
+    Houdt alle FFmpeg-streams van de bot bij: begrenst het aantal tegelijk (FFMPEG_MAX_STREAMS),
+    herstart streams die geen audio meer leveren, ruimt processen op die na cleanup blijven hangen
+    en meet per stream CPU en geheugen.
+    """
+
+    def __init__(self, max_streams=FFMPEG_MAX_STREAMS, queue_timeout=FFMPEG_QUEUE_TIMEOUT,
+                 stall_seconds=FFMPEG_STALL_SECONDS):
+        self.max_streams = max_streams
+        self.queue_timeout = queue_timeout
+        self.stall_seconds = stall_seconds
+        self._slots = asyncio.Semaphore(max_streams) if max_streams > 0 else None
+        self._loop = None
+        self._streams = set()            # actieve SupervisedSources
+        self._reaping = []               # (proces, deadline) van opgeruimde streams
+        self._restarting = set()
+        self._lock = threading.Lock()
+        self._task = None
+        self.rejected = 0
+        self.queued = 0
+        self.restarted = 0
+        self.reaped = 0
+
+    async def acquire(self, wait=True):
+        """
+        Reserveert een plek voor een nieuwe stream. Wacht maximaal queue_timeout seconden
+        (of helemaal niet met wait=False) en geeft anders StreamLimitReached.
+        """
+        self._ensure_monitor()
+        if self._slots is None:
+            return
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        if not wait or self.queue_timeout <= 0:
+            self.rejected += 1
+            raise StreamLimitReached(f"Alle {self.max_streams} streams zijn bezet.")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise StreamLimitReached(
+                f"Alle {self.max_streams} streams bleven {self.queue_timeout:g} seconden bezet."
+            ) from None
+
+    def release(self):
+        """
+        Geeft een plek terug die wel gereserveerd maar niet gebruikt is (bijvoorbeeld als de bron mislukte).
+        """
+        if self._slots is not None:
+            self._slots.release()
+
+    def supervise(self, source, title, restart=None):
+        """
+        Neemt een net gestarte FFmpeg-bron onder toezicht; de plek uit acquire() hoort er nu bij.
+        """
+        supervised = SupervisedSource(self, source, title, restart)
+        with self._lock:
+            self._streams.add(supervised)
+        return supervised
+
+    def _release_threadsafe(self, supervised):
+        # cleanup() draait vaak in de audio-thread van discord.py.
+        with self._lock:
+            if supervised not in self._streams:
+                return
+            self._streams.discard(supervised)
+            if supervised.process is not None:
+                self._reaping.append((supervised.process, time.monotonic() + REAP_GRACE))
+        # Bij afsluiten kan de loop al dicht zijn (AudioSource.__del__ roept cleanup nog aan).
+        if self._slots is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._slots.release)
+
+    def _ensure_monitor(self):
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._monitor())
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            try:
+                self._check_streams()
+                self._reap()
+            except Exception as e:
+                logger.error(f"[FFMPEG] Fout in de supervisor: {e}")
+
+    def _check_streams(self):
+        now = time.monotonic()
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            process = stream.process
+            if process is not None:
+                usage = _process_usage(process.pid)
+                if usage:
+                    cpu_seconds, stream.rss = usage
+                    if stream.cpu:
+                        previous, measured_at = stream.cpu
+                        stream.cpu_percent = 100 * (cpu_seconds - previous) / max(now - measured_at, 1e-6)
+                    stream.cpu = (cpu_seconds, now)
+            # Alleen een read() die al te lang loopt telt: een gepauzeerde of nog niet gestarte stream leest niet.
+            reading_since = stream.reading_since
+            if reading_since is not None and now - reading_since > self.stall_seconds and stream not in self._restarting:
+                self._restarting.add(stream)
+                asyncio.create_task(self._restart(stream))
+
+    async def _restart(self, stream):
+        try:
+            old = stream._inner
+            offset = stream.frames * FRAME_SECONDS
+            if stream.restarts >= MAX_RESTARTS or stream._reopen is None:
+                logger.warning(f"[FFMPEG] Stream '{stream.title}' reageert niet; afgebroken.")
+                await asyncio.to_thread(old.cleanup)
+                return
+            logger.warning(
+                f"[FFMPEG] Stream '{stream.title}' levert geen audio meer; "
+                f"herstart op {offset:.0f}s."
+            )
+            new = await stream._reopen(offset)
+            with self._lock:
+                closed = stream.closed
+                if not closed:
+                    stream._inner = new
+            if closed:
+                # Tijdens het heropenen afgelopen (skip, stop of einde): de nieuwe bron hoort nergens bij
+                # en de plek is al vrijgegeven.
+                await asyncio.to_thread(new.cleanup)
+                return
+            stream.restarts += 1
+            self.restarted += 1
+            # De oude bron killen laat de hangende read() met EOF terugkomen; die leest dan uit de nieuwe.
+            await asyncio.to_thread(old.cleanup)
+        except Exception as e:
+            logger.error(f"[FFMPEG] Herstart van '{stream.title}' mislukt: {e}")
+            await asyncio.to_thread(stream._inner.cleanup)
+        finally:
+            self._restarting.discard(stream)
+
+    def _reap(self):
+        now = time.monotonic()
+        with self._lock:
+            pending, self._reaping = self._reaping, []
+        still_running = []
+        for process, deadline in pending:
+            if process.poll() is not None:  # poll() ruimt het zombieproces ook op
+                self.reaped += 1
+                continue
+            if now > deadline:
+                logger.warning(f"[FFMPEG] Proces {process.pid} draait nog na cleanup; wordt gekild.")
+                process.kill()
+            still_running.append((process, deadline))
+        with self._lock:
+            self._reaping.extend(still_running)
+
+    def stream_stats(self):
+        """
+        Per stream: titel, pid, CPU-gebruik, geheugen, leeftijd en herstarts.
+        """
+        now = time.monotonic()
+        with self._lock:
+            streams = list(self._streams)
+        return [
+            {
+                "title": stream.title,
+                "pid": stream.process.pid if stream.process else None,
+                "cpu_percent": round(stream.cpu_percent, 1),
+                "rss_mib": round(stream.rss / 2 ** 20, 1),
+                "age_s": round(now - stream.started),
+                "silent_s": round(now - stream.last_output),
+                "restarts": stream.restarts,
+            }
+            for stream in streams
+        ]
+
+    def total_cpu_percent(self):
+        with self._lock:
+            return sum(stream.cpu_percent for stream in self._streams)
+
+    def total_rss(self):
+        with self._lock:
+            return sum(stream.rss for stream in self._streams)
+
+    def stats(self):
+        with self._lock:
+            active = len(self._streams)
+            reaping = len(self._reaping)
+        return {
+            "active": active,
+            "max": self.max_streams or "onbeperkt",
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "restarted": self.restarted,
+            "reaped": self.reaped,
+            "reaping": reaping,
+        }
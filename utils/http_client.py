@@ -0,0 +1,158 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import aiohttp
+
+from utils.metrics import API_SECONDS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")  # de YouTube quota reset om middernacht Pacific Time
+except Exception:
+    QUOTA_TIMEZONE = datetime.timezone.utc
+
+HTTP_CACHE_TTL = 7 * 24 * 3600   # een response die zo lang niet gebruikt is, wordt verwijderd
+HTTP_CACHE_MAX_ENTRIES = 5000    # daarboven worden de minst recent gebruikte verwijderd
+QUOTA_HISTORY_DAYS = 30
+
+
+class ApiClient:
+    """
+    Gedeelde HTTP-client voor de hele levensduur van de bot, met keep-alive connection pooling.
+    GET-responses worden met hun ETag op schijf bewaard; een volgende aanvraag stuurt If-None-Match,
+    zodat een ongewijzigde pagina als goedkope 304 terugkomt. Houdt ook het quotaverbruik per dag bij.
+    """
+
+    def __init__(self, cache_path, daily_quota=10000, connection_limit=20, cache_ttl=HTTP_CACHE_TTL,
+                 max_entries=HTTP_CACHE_MAX_ENTRIES):
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self.daily_quota = daily_quota
+        self.connection_limit = connection_limit
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.requests = 0
+        self.not_modified = 0
+        self._session = None
+
+        self._db = sqlite3.connect(cache_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                etag TEXT NOT NULL,
+                body TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS http_cache_stored_at ON http_cache (stored_at);
+            CREATE TABLE IF NOT EXISTS quota (
+                day TEXT PRIMARY KEY,
+                units INTEGER NOT NULL
+            );
+        """)
+        self._evict()
+        self._db.commit()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        return self._session
+
+    @staticmethod
+    def _today():
+        return datetime.datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    def quota_used(self):
+        """
+        Geeft het aantal quota-eenheden terug dat vandaag (Pacific Time) verbruikt is.
+        """
+        row = self._db.execute("SELECT units FROM quota WHERE day = ?", (self._today(),)).fetchone()
+        return row[0] if row else 0
+
+    def quota_left(self):
+        return self.daily_quota - self.quota_used()
+
+    def _charge(self, units):
+        self._db.execute(
+            "INSERT INTO quota VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET units = units + excluded.units",
+            (self._today(), units),
+        )
+        self._db.commit()
+
+    async def get_json(self, url, params, cost=1):
+        """
+        Doet een GET en geeft de JSON-body terug, of None bij een fout (HTTP-status, netwerk, timeout)
+        of als de quota op is. Een 'key' parameter telt niet mee in de cache-sleutel.
+        """
+        if self.quota_left() < cost:
+            logger.warning(f"[HTTP] Dagelijkse quota van {self.daily_quota} eenheden bereikt; aanvraag overgeslagen.")
+            return None
+
+        key = url + "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k != "key")
+        cached = self._db.execute("SELECT etag, body FROM http_cache WHERE key = ?", (key,)).fetchone()
+        headers = {"If-None-Match": cached[0]} if cached else {}
+
+        self.requests += 1
+        self._charge(cost)
+        try:
+            with API_SECONDS.time(url.rsplit("/", 1)[-1]):
+                async with self._get_session().get(url, params=params, headers=headers) as resp:
+                    if resp.status == 304 and cached:
+                        self.not_modified += 1
+                        # stored_at is ook 'laatst gebruikt', voor de LRU.
+                        self._db.execute("UPDATE http_cache SET stored_at = ? WHERE key = ?", (time.time(), key))
+                        self._db.commit()
+                        return json.loads(cached[1])
+                    if resp.status != 200:
+                        body = await resp.text()
+                        logger.warning(f"[HTTP] Mislukte API-call: {resp.status} | Body: {body}")
+                        return None
+                    body = await resp.text()
+                    etag = resp.headers.get("ETag")
+            data = json.loads(body)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning(f"[HTTP] API-call naar {url} mislukt: {e.__class__.__name__} - {e}")
+            return None
+
+        if etag:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?)",
+                (key, etag, body, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+        return data
+
+    def _evict(self):
+        self._db.execute("DELETE FROM http_cache WHERE stored_at < ?", (time.time() - self.cache_ttl,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM http_cache").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM http_cache WHERE key IN (SELECT key FROM http_cache ORDER BY stored_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        oldest_day = (datetime.datetime.now(QUOTA_TIMEZONE).date()
+                      - datetime.timedelta(days=QUOTA_HISTORY_DAYS)).isoformat()
+        self._db.execute("DELETE FROM quota WHERE day < ?", (oldest_day,))
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "quota_used_today": self.quota_used(),
+            "daily_quota": self.daily_quota,
+            "cached_responses": self._db.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0],
+        }
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._db.close()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+LOUDNESS_NORMALIZE = os.getenv("LOUDNESS_NORMALIZE", "off") == "on"
+LOUDNESS_TARGET = float(os.getenv("LOUDNESS_TARGET", "-14"))  # LUFS, ongeveer wat YouTube zelf aanhoudt
+# Onder dit verschil (dB) blijft een Opus-stream ongewijzigd doorgegeven; daarboven is transcoderen het waard.
+LOUDNESS_OPUS_THRESHOLD = float(os.getenv("LOUDNESS_OPUS_THRESHOLD", "3"))
+LOUDNESS_MAX_GAIN = 10.0       # dB, in beide richtingen
+LOUDNESS_SILENCE_LUFS = -60.0  # stiltes en mislukte metingen niet versterken
+MEASURE_TIMEOUT = 600          # seconden voor één meting
+MAX_PENDING = 50               # metingen in de rij; daarboven wordt een nummer een volgende keer gemeten
+
+_INTEGRATED_RE = re.compile(r"I:\s+(-?\d+(?:\.\d+)?) LUFS")
+
+
+async def measure_integrated_loudness(source):
+    """
+    Meet de integrated loudness (EBU R128) van een bestand of stream-URL met FFmpeg's ebur128-filter.
+    Dat is veel lichter dan loudnorm (geen resampling naar 192 kHz) en draait met lage prioriteit
+    (via nice, want preexec_fn is niet veilig in een proces met threads).
+    Geeft LUFS terug, of None als de meting mislukt.
+    """
+    args = ["nice", "-n", "10", "ffmpeg", "-nostats", "-hide_banner", "-threads", "1"]
+    if source.startswith(("http://", "https://")):
+        args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+    args += ["-i", source, "-map", "a:0", "-af", "ebur128=framelog=quiet", "-f", "null", "-"]
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), MEASURE_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+    matches = _INTEGRATED_RE.findall(stderr.decode(errors="replace"))
+    if process.returncode != 0 or not matches:
+        return None
+    return float(matches[-1])  # de laatste is de samenvatting
+
+
+class LoudnessNormalizer:
+    """
+    Meet per nummer één keer de loudness op de achtergrond (na de eerste keer afspelen) en bewaart die
+    per video-id in de TrackCache. Bij latere keren wordt een vaste volume-aanpassing toegepast;
+    een live loudnorm-filter per stream is te zwaar voor de Pi.
+
+    Discord krijgt ruwe Opus-pakketten, zonder de Ogg/WebM-header, dus de 'output gain' uit die header
+    heeft daar geen effect. Een Opus-stream blijft daarom passthrough zolang het verschil klein is en wordt
+    alleen bij een groot verschil via FFmpeg met een volume-filter opnieuw gecodeerd.
+    """
+
+    def __init__(self, cache, get_input, target=LOUDNESS_TARGET, opus_threshold=LOUDNESS_OPUS_THRESHOLD):
+        self._cache = cache
+        self._get_input = get_input  # async functie: track → bestandspad of stream-URL om te meten
+        self.target = target
+        self.opus_threshold = opus_threshold
+        self._pending = set()        # video-id's die gemeten worden of in de rij staan
+        self._lock = asyncio.Lock()  # één meting tegelijk
+        self.measured = 0
+        self.failed = 0
+        self.gained_sources = 0      # bronnen gestart met een volume-aanpassing (ook herstarts van hetzelfde nummer)
+
+    def gain_for(self, video_id, codec=None):
+        """
+        Geeft de toe te passen volume-aanpassing in dB terug, of None als er niets aangepast hoeft te worden.
+        """
+        lufs = self._cache.get_loudness(video_id)
+        if lufs is None or lufs <= LOUDNESS_SILENCE_LUFS:
+            return None
+        gain = max(-LOUDNESS_MAX_GAIN, min(LOUDNESS_MAX_GAIN, self.target - lufs))
+        threshold = self.opus_threshold if codec == "opus" else 0.5
+        if abs(gain) < threshold:
+            return None
+        self.gained_sources += 1
+        return round(gain, 1)
+
+    def schedule(self, track):
+        """
+        Plant een meting als dit nummer nog niet gemeten is.
+        """
+        if len(self._pending) >= MAX_PENDING or track.id in self._pending:
+            return
+        if self._cache.get_loudness(track.id) is not None:
+            return
+        self._pending.add(track.id)
+        asyncio.create_task(self._measure(track))
+
+    async def _measure(self, track):
+        try:
+            async with self._lock:
+                source = await self._get_input(track)
+                lufs = await measure_integrated_loudness(source)
+            if lufs is None:
+                self.failed += 1
+                logger.debug(f"[LOUDNESS] Meting mislukt voor '{track.title}'")
+                return
+            self._cache.put_loudness(track.id, lufs)
+            self.measured += 1
+            logger.debug(f"[LOUDNESS] '{track.title}': {lufs:.1f} LUFS")
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"[LOUDNESS] Fout bij meten van '{track.title}': {e}")
+        finally:
+            self._pending.discard(track.id)
+
+    def stats(self):
+        return {
+            "measured": self.measured,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "gained_sources": self.gained_sources,
+        }
@@ -0,0 +1,251 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Bucketgrenzen in seconden, van een paar milliseconden tot een trage yt-dlp extractie.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, amount=1, *labels):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge:
+    """
+    Gauge met een vaste waarde (set) of een functie die bij het uitlezen wordt aangeroepen,
+    zodat het hete pad er niets voor hoeft te doen.
+    """
+
+    def __init__(self, name, help, callback=None):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        if self.callback is None:
+            return self.value
+        try:
+            return self.callback()
+        except Exception as e:
+            logger.debug(f"[METRICS] Gauge {self.name} kon niet gelezen worden: {e}")
+            return float("nan")
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.get()}"
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """
+    Histogram met vaste buckets; observe() is één bisect en een paar optellingen.
+    """
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """
+        Meet de duur van een (ook async) blok: `with HISTOGRAM.time("label"): await ...`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def quantile(self, q, *labels):
+        """
+        Schatting van een kwantiel: de bovengrens van de bucket waarin het valt.
+        """
+        series = self._series.get(labels)
+        if not series or not series.count:
+            return None
+        target = q * series.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        """
+        Geeft per labelcombinatie het aantal, het gemiddelde en geschatte p50/p95 terug.
+        """
+        result = {}
+        for labels, series in self._series.items():
+            key = ",".join(labels) or "totaal"
+            result[key] = {
+                "count": series.count,
+                "mean": series.sum / series.count if series.count else 0.0,
+                "p50": self.quantile(0.5, *labels),
+                "p95": self.quantile(0.95, *labels),
+            }
+        return result
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series.sum}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {series.count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, callback=None):
+        return self.register(Gauge(name, help, callback))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """
+        Geeft alle metrics terug in het Prometheus tekstformaat.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+EXTRACT_SECONDS = registry.histogram(
+    "musicbot_extract_seconds", "Duur van yt-dlp extracties", ("backend",))
+API_SECONDS = registry.histogram(
+    "musicbot_api_request_seconds", "Duur van HTTP API-aanroepen", ("endpoint",))
+SOURCE_SECONDS = registry.histogram(
+    "musicbot_source_create_seconds", "Tijd om een audiobron te maken (incl. stream-URL ophalen)")
+COMMAND_SECONDS = registry.histogram(
+    "musicbot_command_seconds", "Tijd van interactie tot afgerond commando", ("command",))
+LOOP_LAG_SECONDS = registry.histogram(
+    "musicbot_event_loop_lag_seconds", "Hoeveel later de event loop wakker wordt dan gevraagd",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+STARTUP_SECONDS = registry.gauge(
+    "musicbot_startup_seconds", "Tijd van processtart tot het eerste afgehandelde commando")
+
+_IMPORT_TIME = time.time()
+
+
+def process_uptime():
+    """
+    Seconden sinds de start van het proces. Op Linux uit /proc, zodat ook de interpreter-start
+    en de imports meetellen; elders vanaf het importeren van deze module.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+        return system_uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time() - _IMPORT_TIME
+
+
+def rss_bytes():
+    """
+    Huidig geheugengebruik (resident set size) van het proces in bytes, of 0 als dat niet te lezen is.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+registry.gauge("musicbot_rss_bytes", "Geheugengebruik (RSS) van het proces", rss_bytes)
+
+
+async def monitor_loop_lag(interval=0.5):
+    """
+    Meet doorlopend de vertraging van de event loop (een sleep die te laat terugkomt).
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
+
+
+async def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Start een HTTP-endpoint op localhost dat /metrics in Prometheus tekstformaat serveert.
+    """
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"[METRICS] Prometheus endpoint op http://{host}:{port}/metrics")
+    return runner
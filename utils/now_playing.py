@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import time
+
+import discord
+
+from utils.audio_utils import make_progress_bar
+from utils.embed_builder import send_now_playing, update_progress_bar
+
+logger = logging.getLogger(__name__)
+
+NOW_PLAYING_MIN_INTERVAL = float(os.getenv("NOW_PLAYING_MIN_INTERVAL", "5"))  # seconden tussen edits per guild
+NOW_PLAYING_MAX_INTERVAL = 60.0
+NOW_PLAYING_MAX_INFLIGHT = 5   # gelijktijdige Discord-aanroepen voor alle guilds samen
+TICK_SECONDS = 1.0
+SLOW_EDIT_SECONDS = 1.0        # duurt een edit langer, dan heeft discord.py op een rate limit gewacht
+PROGRESS_BAR_LENGTH = 20
+
+
+class _Session:
+    __slots__ = ("channel", "song", "started", "message", "last_bar", "interval", "next_due", "busy")
+
+    def __init__(self, channel, song, interval, offset=0):
+        self.channel = channel
+        self.song = song
+        self.started = time.monotonic() - offset
+        self.message = None
+        self.last_bar = None
+        self.interval = interval
+        self.next_due = time.monotonic() + interval
+        self.busy = False
+
+
+class NowPlayingTicker:
+    """
+    Eén centrale taak die de 'Now Playing' berichten van alle guilds bijwerkt.
+    Een edit gebeurt alleen als de voortgangsbalk er anders uit zou zien, en het interval per guild
+    groeit als Discord ons laat wachten (rate limit) en krimpt weer als de edits snel gaan.
+    De taak stopt vanzelf als er geen sessies meer zijn.
+    """
+
+    def __init__(self, get_current):
+        self._get_current = get_current  # functie: guild_id → track dat nu speelt (of None)
+        self._channels = {}              # guild_id → kanaal waar het bericht heen gaat
+        self._sessions = {}              # guild_id → _Session
+        self._task = None
+        self._inflight = asyncio.Semaphore(NOW_PLAYING_MAX_INFLIGHT)
+        self.edits = 0
+        self.skipped = 0
+        self.backoffs = 0
+
+    def bind_channel(self, guild_id, channel):
+        """
+        Onthoudt in welk tekstkanaal het 'Now Playing' bericht van een guild moet komen.
+        """
+        self._channels[guild_id] = channel
+
+    def channel_for(self, guild_id):
+        """
+        Het tekstkanaal van de guild, of None; ook bruikbaar voor andere meldingen van de speler.
+        """
+        return self._channels.get(guild_id)
+
+    def start(self, guild_id, song, offset=0):
+        """
+        Begint een sessie voor een nieuw nummer; een eventuele vorige sessie van de guild vervalt.
+        offset is de positie in seconden waarop het nummer begint (na herstel uit het journal).
+        """
+        channel = self._channels.get(guild_id)
+        if channel is None:
+            return
+        # Een balk van 20 tekens verandert pas na duration/20 seconden; vaker editen heeft geen zin.
+        interval = max(NOW_PLAYING_MIN_INTERVAL, (song.duration or 0) / PROGRESS_BAR_LENGTH)
+        self._sessions[guild_id] = _Session(channel, song, min(interval, NOW_PLAYING_MAX_INTERVAL), offset)
+        asyncio.create_task(self._send(guild_id, self._sessions[guild_id]))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self, guild_id):
+        self._sessions.pop(guild_id, None)
+
+    async def _send(self, guild_id, session):
+        session.busy = True
+        try:
+            async with self._inflight:
+                session.message = await send_now_playing(session.channel, session.song)
+        except discord.HTTPException as e:
+            logger.warning(f"[NOWPLAYING] Bericht versturen mislukt in guild {guild_id}: {e}")
+            self._drop(guild_id, session)
+        finally:
+            session.busy = False
+
+    def _drop(self, guild_id, session):
+        if self._sessions.get(guild_id) is session:
+            del self._sessions[guild_id]
+
+    async def _run(self):
+        while self._sessions:
+            await asyncio.sleep(TICK_SECONDS)
+            now = time.monotonic()
+            for guild_id, session in list(self._sessions.items()):
+                if self._get_current(guild_id) is not session.song:
+                    self._drop(guild_id, session)
+                    continue
+                if session.busy or session.message is None or now < session.next_due:
+                    continue
+                elapsed = min(int(now - session.started), session.song.duration or 0)
+                bar = make_progress_bar(elapsed, session.song.duration or 1, PROGRESS_BAR_LENGTH)
+                session.next_due = now + session.interval
+                if bar == session.last_bar:
+                    self.skipped += 1
+                    continue
+                session.last_bar = bar
+                session.busy = True
+                asyncio.create_task(self._edit(guild_id, session, elapsed))
+
+    async def _edit(self, guild_id, session, elapsed):
+        try:
+            async with self._inflight:
+                start = time.monotonic()
+                await update_progress_bar(session.message, session.song, elapsed)
+                took = time.monotonic() - start
+            self.edits += 1
+            if took > SLOW_EDIT_SECONDS:
+                self._back_off(session)
+            else:
+                base = max(NOW_PLAYING_MIN_INTERVAL, (session.song.duration or 0) / PROGRESS_BAR_LENGTH)
+                session.interval = max(min(base, NOW_PLAYING_MAX_INTERVAL), session.interval * 0.8)
+        except discord.NotFound:
+            # Bericht is verwijderd: niets meer om bij te werken.
+            self._drop(guild_id, session)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self._back_off(session)
+            else:
+                logger.warning(f"[NOWPLAYING] Edit mislukt in guild {guild_id}: {e}")
+                self._drop(guild_id, session)
+        finally:
+            session.busy = False
+
+    def _back_off(self, session):
+        self.backoffs += 1
+        session.interval = min(session.interval * 2, NOW_PLAYING_MAX_INTERVAL)
+        session.next_due = time.monotonic() + session.interval
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "edits": self.edits,
+            "skipped": self.skipped,
+            "backoffs": self.backoffs,
+        }
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+
+from utils.ffmpeg_supervisor import StreamLimitReached
+from utils.queue_manager import pop_next_song, peek_next_song, mark_current, push_front, resume_offset
+
+logger = logging.getLogger(__name__)
+
+MAX_SOURCE_ATTEMPTS = 3       # pogingen per nummer voordat het overgeslagen wordt
+MAX_CONSECUTIVE_FAILURES = 5  # daarna stopt de speler in plaats van de hele wachtrij af te lopen
+RETRY_BACKOFF = 0.5           # seconden, verdubbelt per mislukte poging
+
+# Events voor de speler-taak
+PLAY = "play"
+TRACK_ENDED = "track_ended"
+STOP = "stop"
+CLOSE = "close"
+
+
+class GuildPlayer:
+    """
+    Speler voor één guild: één asyncio-taak verwerkt commando's en 'nummer afgelopen' events
+    uit een wachtrij. De after-callback van discord.py zet alleen een event klaar,
+    zodat de audio-thread nooit wacht op het opbouwen van de volgende bron.
+    """
+
+    def __init__(self, guild, make_source, prewarmer=None, gap_recorder=None, on_track_start=None, on_error=None):
+        self.guild = guild
+        self.current = None
+        self._make_source = make_source      # async functie: track → AudioSource
+        self._prewarmer = prewarmer
+        self._gap_recorder = gap_recorder
+        self._on_track_start = on_track_start  # functie(guild_id, track), na de start van een nummer
+        self._on_error = on_error              # functie(guild_id, bericht), voor meldingen aan de gebruikers
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._seq = 0                          # volgnummer van het nummer dat nu speelt
+        self._task = asyncio.create_task(self._run())
+
+    def play(self):
+        """
+        Start het afspelen als de speler stilstaat.
+        """
+        self._events.put_nowait((PLAY, None))
+
+    def stop(self):
+        """
+        Markeert de speler als gestopt; een nog binnenkomend 'afgelopen' event start niets nieuws.
+        """
+        self._events.put_nowait((STOP, None))
+
+    def close(self):
+        self._events.put_nowait((CLOSE, None))
+
+    def _after_playing(self, seq, error):
+        # Draait in de audio-thread van discord.py.
+        if self._gap_recorder:
+            self._gap_recorder.mark_ended(self.guild.id)
+        if error:
+            logger.error(f"Fout bij afspelen: {error}")
+        self._loop.call_soon_threadsafe(self._events.put_nowait, (TRACK_ENDED, seq))
+
+    async def _run(self):
+        while True:
+            event, arg = await self._events.get()
+            try:
+                if event == CLOSE:
+                    return
+                if event == STOP:
+                    self._seq += 1
+                    self.current = None
+                    mark_current(self.guild.id, None)
+                elif event == PLAY:
+                    voice_client = self.guild.voice_client
+                    if voice_client and (voice_client.is_playing() or voice_client.is_paused()):
+                        continue
+                    await self._play_next()
+                elif event == TRACK_ENDED and arg == self._seq:
+                    self.current = None
+                    mark_current(self.guild.id, None)
+                    await self._play_next()
+            except Exception as e:
+                logger.error(f"Fout in speler van guild {self.guild.id}: {e}")
+
+    async def _play_next(self):
+        guild_id = self.guild.id
+        failures = 0
+        while True:
+            # Eerst de verbinding controleren: een nummer dat al uit de wachtrij is, zou anders verloren gaan.
+            voice_client = self.guild.voice_client
+            if not voice_client or not voice_client.is_connected():
+                logger.info(f"Geen voice-verbinding in guild {guild_id}; afspelen gestopt.")
+                return
+
+            song = pop_next_song(guild_id)
+            if not song:
+                if self._prewarmer:
+                    self._prewarmer.cancel(guild_id)
+                if self._gap_recorder:
+                    self._gap_recorder.reset(guild_id)
+                return
+
+            try:
+                if await self._start(voice_client, song):
+                    return
+            except StreamLimitReached as e:
+                # Geen fout van het nummer: terug vooraan de wachtrij, zodat /play het later weer oppakt.
+                push_front(guild_id, song)
+                logger.warning(f"[FFMPEG] '{song.title}' niet gestart in guild {guild_id}: {e}")
+                if self._on_error:
+                    self._on_error(guild_id, f"⏳ {e} '{song.title}' blijft bovenaan de wachtrij; probeer het straks opnieuw.")
+                return
+
+            failures += 1
+            if failures >= MAX_CONSECUTIVE_FAILURES:
+                logger.error(f"{failures} nummers op rij mislukt in guild {guild_id}; speler stopt.")
+                return
+            await asyncio.sleep(RETRY_BACKOFF * failures)
+
+    async def _start(self, voice_client, song):
+        """
+        Probeert een nummer te starten, met een begrensd aantal pogingen en oplopende wachttijd.
+        Een uit het journal hersteld nummer begint op de positie waar het was.
+        """
+        guild_id = self.guild.id
+        offset = resume_offset(guild_id, song)
+        source = None
+        for attempt in range(MAX_SOURCE_ATTEMPTS):
+            try:
+                if attempt == 0 and self._prewarmer and not offset:
+                    source = await self._prewarmer.take(guild_id, song)
+                if offset:
+                    source = await self._make_source(song, start_seconds=offset)
+                else:
+                    source = source or await self._make_source(song)
+                break
+            except StreamLimitReached:
+                raise
+            except Exception as e:
+                logger.warning(f"Fout bij het maken van audio bron ({attempt + 1}/{MAX_SOURCE_ATTEMPTS}) voor '{song.title}': {e}")
+                if attempt + 1 < MAX_SOURCE_ATTEMPTS:
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        if source is None:
+            return False
+        # Een broadcast-luisteraar kan halverwege instappen; dan loopt het nummer vanaf die positie.
+        resumed = bool(offset)
+        offset = offset or getattr(source, "start_offset", 0)
+
+        if self._gap_recorder:
+            source = self._gap_recorder.wrap(guild_id, source)
+        self._seq += 1
+        seq = self._seq
+        try:
+            voice_client.play(source, after=lambda error: self._after_playing(seq, error))
+        except Exception as e:
+            logger.error(f"Fout bij voice_client.play: {e}")
+            source.cleanup()
+            return False
+
+        self.current = song
+        mark_current(guild_id, song, offset)
+        if offset and resumed:
+            logger.info(f"[QUEUE] '{song.title}' in guild {guild_id} hervat op {offset:.0f}s.")
+        if self._prewarmer:
+            self._prewarmer.schedule(guild_id, song.duration - offset, lambda: peek_next_song(guild_id))
+        if self._on_track_start:
+            self._on_track_start(guild_id, song, offset)
+        return True
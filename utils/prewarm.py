@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import math
+import os
+import statistics
+import time
+from collections import deque
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+PREWARM_SECONDS = float(os.getenv("PREWARM_SECONDS", "5"))
+
+
+class Prewarmer:
+    """
+    Start de audiobron van het volgende nummer al een paar seconden voordat het huidige eindigt.
+    FFmpeg is dan al opgestart en heeft de stream geopend, zodat de overgang direct kan.
+    """
+
+    def __init__(self, make_source, lead=PREWARM_SECONDS):
+        self._make_source = make_source  # async functie: track → AudioSource
+        self.lead = lead
+        self._timers = {}                # guild_id → asyncio.TimerHandle
+        self._slots = {}                 # guild_id → (video_id, asyncio.Task met de bron)
+
+    def schedule(self, guild_id, duration, get_next_track):
+        """
+        Plant het voorbereiden van het volgende nummer `lead` seconden voor het einde van het huidige.
+        `get_next_track` wordt pas op dat moment aangeroepen, zodat latere wijzigingen in de wachtrij meetellen.
+        """
+        self._cancel_timer(guild_id)
+        if self.lead <= 0 or not duration:
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(0, duration - self.lead)
+        self._timers[guild_id] = loop.call_later(delay, self._prewarm, guild_id, get_next_track)
+
+    def _prewarm(self, guild_id, get_next_track):
+        self._timers.pop(guild_id, None)
+        track = get_next_track()
+        if not track:
+            return
+        slot = self._slots.get(guild_id)
+        if slot and slot[0] == track.id:
+            return
+        self._discard(guild_id)
+        logger.debug(f"[PREWARM] Volgende bron voorbereiden voor guild {guild_id}: {track.title}")
+        self._slots[guild_id] = (track.id, asyncio.ensure_future(self._make_source(track)))
+
+    async def take(self, guild_id, track):
+        """
+        Geeft de voorbereide bron voor deze track terug, of None als er geen (bruikbare) klaarstaat.
+        """
+        slot = self._slots.get(guild_id)
+        if not slot:
+            return None
+        if slot[0] != track.id:
+            self._discard(guild_id)
+            return None
+        del self._slots[guild_id]
+        try:
+            return await slot[1]
+        except Exception as e:
+            logger.warning(f"[PREWARM] Voorbereide bron mislukt: {e}")
+            return None
+
+    def cancel(self, guild_id):
+        """
+        Stopt de geplande voorbereiding en ruimt een eventueel al gestarte bron op.
+        """
+        self._cancel_timer(guild_id)
+        self._discard(guild_id)
+
+    def _cancel_timer(self, guild_id):
+        timer = self._timers.pop(guild_id, None)
+        if timer:
+            timer.cancel()
+
+    def _discard(self, guild_id):
+        slot = self._slots.pop(guild_id, None)
+        if not slot:
+            return
+        task = slot[1]
+        if task.done():
+            if not task.cancelled() and task.exception() is None:
+                task.result().cleanup()
+        else:
+            task.cancel()
+            task.add_done_callback(
+                lambda t: t.result().cleanup() if not t.cancelled() and t.exception() is None else None
+            )
+
+
+class _FirstFrameSource(discord.AudioSource):
+    """
+    Geeft de audio van een bron door en roept on_first_frame aan bij het eerste niet-lege frame.
+    Daarna vervangt read zichzelf door die van de bron, zodat de rest van het nummer niets extra kost.
+    """
+
+    def __init__(self, source, on_first_frame):
+        self._source = source
+        self._on_first_frame = on_first_frame
+
+    def read(self):
+        data = self._source.read()
+        if data:
+            self.read = self._source.read
+            self._on_first_frame()
+        return data
+
+    def is_opus(self):
+        return self._source.is_opus()
+
+    def cleanup(self):
+        self._source.cleanup()
+
+
+class GapRecorder:
+    """
+    Meet de stilte tussen het einde van een nummer en de start van het volgende, per guild.
+    De start is het eerste audioframe van de nieuwe bron (via wrap), dus inclusief het opstarten van
+    FFmpeg en het openen van de stream. mark_ended en mark_started draaien in de audio-thread van discord.py.
+    """
+
+    def __init__(self, size=200):
+        self._ended = {}               # guild_id → perf_counter bij einde vorig nummer
+        self.gaps = deque(maxlen=size)  # recente gaps in seconden
+
+    def mark_ended(self, guild_id):
+        self._ended[guild_id] = time.perf_counter()
+
+    def wrap(self, guild_id, source):
+        """
+        Geeft de bron terug met een meting van de gap bij het eerste audioframe.
+        """
+        def on_first_frame():
+            gap = self.mark_started(guild_id)
+            if gap is not None:
+                logger.info(f"Gap tussen nummers in guild {guild_id}: {gap * 1000:.0f} ms")
+        return _FirstFrameSource(source, on_first_frame)
+
+    def mark_started(self, guild_id):
+        """
+        Registreert de start van een nummer en geeft de gap in seconden terug (None voor het eerste nummer).
+        """
+        ended = self._ended.pop(guild_id, None)
+        if ended is None:
+            return None
+        gap = time.perf_counter() - ended
+        self.gaps.append(gap)
+        return gap
+
+    def reset(self, guild_id):
+        self._ended.pop(guild_id, None)
+
+    def summary(self):
+        if not self.gaps:
+            return {"count": 0}
+        ordered = sorted(self.gaps)
+        return {
+            "count": len(ordered),
+            "mean_ms": statistics.fmean(ordered) * 1000,
+            "p95_ms": ordered[math.ceil(0.95 * len(ordered)) - 1] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
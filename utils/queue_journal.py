@@ -0,0 +1,216 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FLUSH_INTERVAL = 1.0    # seconden tussen het wegschrijven van gebufferde mutaties
+JOURNAL_COMPACT_RECORDS = 5000  # na zoveel regels in het journal volgt een compactie
+JOURNAL_COMPACT_INTERVAL = 600  # en anders in elk geval na zoveel seconden (als er iets veranderd is)
+JOURNAL_HEARTBEAT = 15          # seconden; de mtime van het journal geeft na een crash aan tot wanneer er gespeeld werd
+
+
+def empty_state():
+    return {"queue": [], "current": None, "started_at": None, "looping": False}
+
+
+def apply_record(states, op, guild_id, args):
+    """
+    Past één journal-regel toe op de ruwe toestand (dicts, geen Tracks) van een guild.
+    """
+    state = states.setdefault(guild_id, empty_state())
+    queue = state["queue"]
+    if op == "add":
+        queue.extend(args[0])
+    elif op == "front":
+        queue.insert(0, args[0])
+    elif op == "pop":
+        if queue:
+            queue.pop(0)
+    elif op == "remove":
+        if 0 <= args[0] < len(queue):
+            queue.pop(args[0])
+    elif op == "move":
+        if 0 <= args[0] < len(queue):
+            queue.insert(args[1], queue.pop(args[0]))
+    elif op == "shuffle":
+        # Zelfde algoritme en seed als TrackQueue.shuffle, dus dezelfde volgorde.
+        random.Random(args[0]).shuffle(queue)
+    elif op == "reset":
+        states[guild_id] = empty_state()
+    elif op == "current":
+        state["current"] = args[0]
+        state["started_at"] = args[1] if len(args) > 1 else None
+    elif op == "loop":
+        state["looping"] = args[0]
+
+
+class QueueJournal:
+    """
+    Append-only journal van wachtrij-mutaties, zodat wachtrijen een herstart of crash overleven.
+
+    Op het hete pad (record) wordt alleen een tuple aan een lijst toegevoegd. Een achtergrondtaak schrijft
+    de buffer elke JOURNAL_FLUSH_INTERVAL seconden in één keer weg (buiten de event loop) en vervangt het
+    journal af en toe door een snapshot. Elke regel heeft een volgnummer; de snapshot onthoudt het laatste,
+    zodat een crash tussen snapshot en het legen van het journal geen mutaties dubbel toepast.
+
+    Eén map hoort bij één proces: compactie leegt het journal en overschrijft de snapshot met de eigen toestand.
+    Een tweede proces op dezelfde map krijgt daarom BlockingIOError (lockbestand).
+    """
+
+    def __init__(self, directory, export_state):
+        os.makedirs(directory, exist_ok=True)
+        self._lock_handle = open(os.path.join(directory, "queues.lock"), "a")
+        try:
+            fcntl.flock(self._lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_handle.close()
+            raise
+        self.journal_path = os.path.join(directory, "queues.journal")
+        self.snapshot_path = os.path.join(directory, "queues.snapshot.json")
+        self._export_state = export_state  # functie: → {guild_id: state} van de geladen guilds
+        self._buffer = []
+        self._seq = 0
+        self._journal_records = 0
+        self._last_compact = time.monotonic()
+        self._restored = {}                # guild_id → state, nog niet door een guild opgevraagd
+        self._last_heartbeat = 0.0
+        self.saved_at = None               # wandkloktijd waarop de vorige run voor het laatst schreef (na load)
+        self._task = None
+        self._file_lock = threading.Lock()  # append en snapshot+legen mogen niet door elkaar lopen
+        self.records = 0
+        self.compactions = 0
+
+    def record(self, op, guild_id, *args):
+        self._seq += 1
+        self._buffer.append((self._seq, op, guild_id, args))
+        self.records += 1
+
+    def take(self, guild_id):
+        """
+        Geeft de herstelde toestand van een guild één keer terug (of None); daarna beheert queue_manager hem.
+        """
+        return self._restored.pop(guild_id, None)
+
+    def load(self):
+        """
+        Leest snapshot en journal en bouwt de toestand per guild op, zonder Tracks te maken.
+        Een half weggeschreven laatste regel (crash tijdens schrijven) wordt overgeslagen.
+        """
+        states, snapshot_seq = {}, 0
+        mtimes = [os.path.getmtime(path) for path in (self.journal_path, self.snapshot_path) if os.path.exists(path)]
+        self.saved_at = max(mtimes, default=None)
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            snapshot_seq = snapshot["seq"]
+            states = {int(guild_id): state for guild_id, state in snapshot["guilds"].items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[QUEUE] Snapshot van de wachtrijen onleesbaar: {e}")
+
+        self._seq = snapshot_seq
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, op, guild_id, args = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._journal_records += 1
+                    if seq <= snapshot_seq:
+                        continue
+                    apply_record(states, op, guild_id, args)
+                    self._seq = max(self._seq, seq)
+        except FileNotFoundError:
+            pass
+
+        self._restored = {
+            guild_id: state for guild_id, state in states.items() if state["queue"] or state["current"]
+        }
+        logger.info(f"[QUEUE] {len(self._restored)} wachtrijen hersteld uit het journal.")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(JOURNAL_FLUSH_INTERVAL)
+            try:
+                due = time.monotonic() - self._last_compact > JOURNAL_COMPACT_INTERVAL
+                if self._journal_records > JOURNAL_COMPACT_RECORDS or (due and self._buffer):
+                    await self._compact()
+                elif self._buffer:
+                    batch, self._buffer = self._buffer, []
+                    await asyncio.to_thread(self._append, batch)
+                elif time.monotonic() - self._last_heartbeat > JOURNAL_HEARTBEAT:
+                    await asyncio.to_thread(self._touch)
+            except Exception as e:
+                logger.error(f"[QUEUE] Fout bij het schrijven van het journal: {e}")
+
+    def _append(self, batch):
+        data = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in batch)
+        with self._file_lock, open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_records += len(batch)
+        self._last_heartbeat = time.monotonic()
+
+    def _touch(self):
+        # Alleen de mtime bijwerken (geen fsync): zo weet de volgende start hoe ver het nummer was.
+        with self._file_lock, open(self.journal_path, "a"):
+            os.utime(self.journal_path)
+        self._last_heartbeat = time.monotonic()
+
+    async def _compact(self):
+        # Snapshot en het legen van de buffer gebeuren samen in de event loop: alles in de buffer zit in de snapshot.
+        guilds = dict(self._restored)
+        guilds.update(self._export_state())
+        snapshot = {"seq": self._seq, "guilds": {str(guild_id): state for guild_id, state in guilds.items()}}
+        self._buffer = []
+        await asyncio.to_thread(self._write_snapshot, snapshot)
+        self._journal_records = 0
+        self._last_compact = time.monotonic()
+        self.compactions += 1
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = self.snapshot_path + ".tmp"
+        with self._file_lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Pas na de snapshot het journal legen; een crash hiertussen is onschadelijk dankzij de volgnummers.
+            open(self.journal_path, "w").close()
+
+    def close(self):
+        """
+        Schrijft wat nog in de buffer staat direct weg (bij afsluiten).
+        """
+        if self._task:
+            self._task.cancel()
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            self._append(batch)
+        else:
+            self._touch()
+        self._lock_handle.close()
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "buffered": len(self._buffer),
+            "journal_records": self._journal_records,
+            "compactions": self.compactions,
+            "restorable_guilds": len(self._restored),
+        }
+
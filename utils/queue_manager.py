@@ -1,24 +1,239 @@
+import itertools
+import random
+import time
 from collections import deque
+from dataclasses import dataclass
+
+from utils.queue_journal import QueueJournal
 
 # Opslag per guild
-queue_map = {}        # guild_id → deque van songs
+queue_map = {}        # guild_id → TrackQueue
 looping_map = {}      # guild_id → bool
+current_map = {}      # guild_id → Track dat nu speelt (voor het journal)
+started_map = {}      # guild_id → wandkloktijd waarop dat nummer (vanaf 0:00 gerekend) begon
+resume_map = {}       # guild_id → (video-id, seconden) om een hersteld nummer verderop te laten beginnen
+import_map = {}       # guild_id → set van lopende playlist-imports (asyncio.Task)
+
+RESUME_MIN_SECONDS = 5  # verder dan dit in het nummer: hervatten; anders gewoon opnieuw beginnen
+RESUME_END_MARGIN = 5   # binnen zoveel seconden van het einde: het nummer was eigenlijk klaar
+
+journal = None        # QueueJournal, als persistente wachtrijen aan staan
+
+
+@dataclass(slots=True)
+class Track:
+    """
+    Metadata van één nummer in de wachtrij. De stream-URL wordt pas bij het afspelen opgehaald.
+    """
+    id: str
+    title: str = "Onbekend"
+    webpage_url: str = None
+    duration: int = 0
+    thumbnail: str = None
+    requester: str = None
+
+    def __post_init__(self):
+        if not self.webpage_url:
+            self.webpage_url = f"https://www.youtube.com/watch?v={self.id}"
+
+    def to_dict(self):
+        """
+        Geeft de metadata terug als dict (zonder aanvrager), bijvoorbeeld om op te slaan in de cache.
+        """
+        return {
+            "id": self.id,
+            "title": self.title,
+            "webpage_url": self.webpage_url,
+            "duration": self.duration,
+            "thumbnail": self.thumbnail,
+        }
+
+    def to_queue_dict(self):
+        """
+        Zoals to_dict, maar met de aanvrager erbij: voor het wachtrij-journal.
+        """
+        data = self.to_dict()
+        data["requester"] = self.requester
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data["id"],
+            title=data.get("title") or "Onbekend",
+            webpage_url=data.get("webpage_url"),
+            duration=int(data.get("duration") or 0),
+            thumbnail=data.get("thumbnail"),
+            requester=data.get("requester"),
+        )
+
+
+class TrackQueue:
+    """
+    Wachtrij van Tracks die de totale duur bijhoudt, zodat lengte en duur O(1) zijn.
+    Weergeven gebeurt met slice(), dat alleen de gevraagde nummers langsloopt.
+    """
+
+    __slots__ = ("_items", "total_duration")
+
+    def __init__(self, tracks=()):
+        self._items = deque()
+        self.total_duration = 0
+        self.extend(tracks)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def extend(self, tracks):
+        for track in tracks:
+            self._items.append(track)
+            self.total_duration += track.duration
+
+    def appendleft(self, track):
+        self._items.appendleft(track)
+        self.total_duration += track.duration
+
+    def popleft(self):
+        track = self._items.popleft()
+        self.total_duration -= track.duration
+        return track
+
+    def slice(self, start, stop):
+        """
+        Geeft de nummers start..stop terug als lijst, zonder de hele wachtrij te kopiëren.
+        """
+        return list(itertools.islice(self._items, start, stop))
+
+    def remove_at(self, index):
+        """
+        Verwijdert het nummer op positie index (0 = eerstvolgende) en geeft het terug.
+        """
+        track = self._items[index]
+        del self._items[index]
+        self.total_duration -= track.duration
+        return track
+
+    def move(self, source, target):
+        """
+        Verplaatst het nummer op positie source naar positie target.
+        """
+        track = self._items[source]
+        del self._items[source]
+        self._items.insert(target, track)
+
+    def shuffle(self, seed=None):
+        """
+        Schudt de wachtrij. Met dezelfde seed komt dezelfde volgorde eruit, zodat het journal alleen de seed bewaart.
+        Indexeren in een deque is O(n), dus er wordt geschud in één tijdelijke lijst van verwijzingen;
+        de deque zelf wordt hergebruikt.
+        """
+        items = list(self._items)
+        random.Random(seed).shuffle(items)
+        self._items.clear()
+        self._items.extend(items)
+
+
+def enable_journal(directory):
+    """
+    Zet persistente wachtrijen aan: leest het journal in en geeft de QueueJournal terug
+    (de aanroeper start de schrijftaak met journal.start()). Guilds worden pas hersteld als ze gebruikt worden.
+    """
+    global journal
+    journal = QueueJournal(directory, export_state)
+    journal.load()
+    return journal
+
+
+def export_state():
+    """
+    Toestand van alle geladen guilds als dicts, voor de snapshot van het journal.
+    """
+    return {
+        guild_id: {
+            "queue": [track.to_queue_dict() for track in queue],
+            "current": current_map[guild_id].to_queue_dict() if current_map.get(guild_id) else None,
+            "started_at": started_map.get(guild_id),
+            "looping": looping_map.get(guild_id, False),
+        }
+        for guild_id, queue in queue_map.items()
+    }
+
+
+def _restore(guild_id):
+    """
+    Bouwt de wachtrij van een guild op uit het journal. Het nummer dat speelde komt vooraan en begint
+    waar het was: de starttijd staat in het journal, het einde is de laatste keer dat het journal geschreven werd.
+    Metadata komt uit het journal, er wordt niets opnieuw geëxtraheerd.
+    """
+    state = journal.take(guild_id) if journal else None
+    if state is None:
+        return TrackQueue()
+    looping_map[guild_id] = state["looping"]
+    current, started_at = state["current"], state.get("started_at")
+    if current and started_at and journal.saved_at:
+        offset = journal.saved_at - started_at
+        if RESUME_MIN_SECONDS < offset < (current.get("duration") or 0) - RESUME_END_MARGIN:
+            resume_map[guild_id] = (current["id"], round(offset, 1))
+    tracks = [state["current"]] if state["current"] else []
+    tracks += state["queue"]
+    if state["current"]:
+        # Het journal moet dezelfde wachtrij zien als het geheugen: het nummer staat nu weer vooraan.
+        journal.record("reset", guild_id)
+        journal.record("add", guild_id, tracks)
+        journal.record("loop", guild_id, state["looping"])
+    return TrackQueue(Track.from_dict(data) for data in tracks)
 
 
 def get_queue(guild_id):
     """
     Geeft de wachtrij van de opgegeven guild terug.
-    Maakt er een lege deque van als deze nog niet bestaat.
+    Maakt er een lege TrackQueue van als deze nog niet bestaat.
     """
-    return queue_map.setdefault(guild_id, deque())
+    queue = queue_map.get(guild_id)
+    if queue is None:
+        queue = queue_map[guild_id] = _restore(guild_id)
+    return queue
 
 
 def reset_queue(guild_id):
     """
     Leegt de wachtrij en zet looping uit voor de opgegeven guild.
     """
-    queue_map[guild_id] = deque()
+    cancel_imports(guild_id)
+    queue_map[guild_id] = TrackQueue()
     looping_map[guild_id] = False
+    current_map.pop(guild_id, None)
+    started_map.pop(guild_id, None)
+    resume_map.pop(guild_id, None)
+    if journal:
+        journal.take(guild_id)
+        journal.record("reset", guild_id)
+
+
+def register_import(guild_id, task):
+    """
+    Koppelt een lopende playlist-import aan de guild, zodat reset_queue hem kan annuleren.
+    """
+    tasks = import_map.setdefault(guild_id, set())
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+
+
+def cancel_imports(guild_id):
+    """
+    Annuleert alle lopende playlist-imports van de opgegeven guild.
+    """
+    for task in import_map.pop(guild_id, set()):
+        task.cancel()
 
 
 def add_to_queue(guild_id, songs):
@@ -26,6 +241,8 @@ def add_to_queue(guild_id, songs):
     Voegt een lijst van songs toe aan de wachtrij.
     """
     get_queue(guild_id).extend(songs)
+    if journal:
+        journal.record("add", guild_id, [song.to_queue_dict() for song in songs])
 
 
 def pop_next_song(guild_id):
@@ -33,7 +250,75 @@ def pop_next_song(guild_id):
     Haalt het eerstvolgende nummer uit de wachtrij en verwijdert het.
     """
     q = get_queue(guild_id)
-    return q.popleft() if q else None
+    if not q:
+        return None
+    if journal:
+        journal.record("pop", guild_id)
+    return q.popleft()
+
+
+def push_front(guild_id, song):
+    """
+    Zet een nummer terug vooraan in de wachtrij, bijvoorbeeld als het nu niet gestart kon worden.
+    """
+    get_queue(guild_id).appendleft(song)
+    if journal:
+        journal.record("front", guild_id, song.to_queue_dict())
+
+
+def mark_current(guild_id, song, offset=0):
+    """
+    Legt vast welk nummer nu speelt (of None) en sinds wanneer, zodat het na een herstart vooraan terugkomt
+    en op dezelfde positie verdergaat. offset is de positie waarop het nummer nu begon.
+    """
+    resume_map.pop(guild_id, None)
+    if song is None:
+        current_map.pop(guild_id, None)
+        started_map.pop(guild_id, None)
+        started_at = None
+    else:
+        current_map[guild_id] = song
+        started_at = started_map[guild_id] = time.time() - offset
+    if journal:
+        journal.record("current", guild_id, song.to_queue_dict() if song else None, started_at)
+
+
+def resume_offset(guild_id, song):
+    """
+    Geeft de positie (seconden) terug waarop een hersteld nummer moet beginnen, of 0. Geldt alleen als
+    het nummer hetzelfde is als wat er voor de herstart speelde, en vervalt zodra er iets start (mark_current).
+    """
+    entry = resume_map.get(guild_id)
+    return entry[1] if entry and entry[0] == song.id else 0
+
+
+def remove_from_queue(guild_id, index):
+    """
+    Verwijdert het nummer op positie index uit de wachtrij en geeft het terug.
+    """
+    track = get_queue(guild_id).remove_at(index)
+    if journal:
+        journal.record("remove", guild_id, index)
+    return track
+
+
+def move_in_queue(guild_id, source, target):
+    """
+    Verplaatst een nummer binnen de wachtrij.
+    """
+    get_queue(guild_id).move(source, target)
+    if journal:
+        journal.record("move", guild_id, source, target)
+
+
+def shuffle_queue(guild_id):
+    """
+    Schudt de wachtrij van de opgegeven guild.
+    """
+    seed = random.getrandbits(64)
+    get_queue(guild_id).shuffle(seed)
+    if journal:
+        journal.record("shuffle", guild_id, seed)
 
 
 def peek_next_song(guild_id):
@@ -57,6 +342,8 @@ def toggle_looping(guild_id):
     """
     current = looping_map.get(guild_id, False)
     looping_map[guild_id] = not current
+    if journal:
+        journal.record("loop", guild_id, looping_map[guild_id])
     return looping_map[guild_id]
 
 
@@ -78,5 +365,4 @@ def get_total_duration(guild_id):
     """
     Geeft de totale duur van de wachtrij in seconden terug.
     """
-    q = get_queue(guild_id)
-    return sum(song.get("duration", 0) for song in q)
\ No newline at end of file
+    return get_queue(guild_id).total_duration
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Voegt gelijktijdige aanroepen met dezelfde sleutel samen: de eerste aanroeper start het werk,
+    de rest wacht op hetzelfde resultaat in plaats van het opnieuw te doen.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # sleutel → asyncio.Task
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """
+        Voert fn() uit voor deze sleutel, of wacht op een al lopende uitvoering ervan.
+        Annuleren van één wachtende aanroeper annuleert het gedeelde werk niet.
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
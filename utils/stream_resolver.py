@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+STREAM_DEFAULT_TTL = 5 * 3600     # googlevideo URLs verlopen na ~6 uur
+STREAM_REFRESH_MARGIN = 10 * 60   # ververs een URL als hij binnen 10 minuten verloopt
+STREAM_CACHE_MAX = 1000           # maximaal aantal bewaarde stream-URLs
+
+# Directe stream-URL met de audiocodec die yt-dlp koos (bijv. 'opus'), zodat de speler weet of hij kan doorgeven.
+StreamInfo = namedtuple("StreamInfo", ["url", "acodec"])
+
+
+def stream_url_expiry(stream_url, now=None):
+    """
+    Leest het verlooptijdstip (unix tijd) uit de 'expire' parameter van een googlevideo URL.
+    Valt terug op STREAM_DEFAULT_TTL als de parameter ontbreekt.
+    """
+    now = time.time() if now is None else now
+    expire = parse_qs(urlparse(stream_url).query).get("expire", [None])[0]
+    try:
+        return float(expire)
+    except (TypeError, ValueError):
+        return now + STREAM_DEFAULT_TTL
+
+
+class StreamResolver:
+    """
+    Zoekt de directe stream-URL van een track pas op wanneer die nodig is.
+    Opgehaalde URLs worden per video-id bewaard tot kort voor ze verlopen,
+    en de volgende nummers in de wachtrij kunnen op de achtergrond worden voorbereid.
+    """
+
+    def __init__(self, extract, refresh_margin=STREAM_REFRESH_MARGIN, cache=None):
+        self._extract = extract          # async functie: query → yt-dlp info dict
+        self.refresh_margin = refresh_margin
+        self._persistent = cache         # optionele TrackCache, overleeft een herstart
+        self._cache = {}                 # video_id → (StreamInfo, expires_at)
+        self._inflight = {}              # video_id → asyncio.Task
+
+    def store(self, video_id, stream_url, acodec=None):
+        stream = StreamInfo(stream_url, acodec)
+        expires_at = stream_url_expiry(stream_url)
+        if self._persistent is not None:
+            self._persistent.put_stream(video_id, stream, expires_at)
+        self._cache.pop(video_id, None)
+        self._cache[video_id] = (stream, expires_at)
+        if len(self._cache) > STREAM_CACHE_MAX:
+            # Dicts behouden invoegvolgorde: de eerste sleutel is de oudste.
+            del self._cache[next(iter(self._cache))]
+
+    def get_cached(self, video_id):
+        """
+        Geeft de bewaarde StreamInfo terug, of None als die ontbreekt of bijna verlopen is.
+        """
+        cached = self._cache.get(video_id)
+        if not cached:
+            if self._persistent is not None:
+                return self._persistent.get_stream(video_id, min_valid=self.refresh_margin)
+            return None
+        stream, expires_at = cached
+        if expires_at - time.time() < self.refresh_margin:
+            del self._cache[video_id]
+            return None
+        return stream
+
+    async def _fetch(self, track):
+        info = await self._extract(track.webpage_url)
+        if not info or not info.get('url'):
+            raise LookupError(f"Geen stream-URL gevonden voor {track.webpage_url}")
+        self.store(track.id, info['url'], info.get('acodec'))
+        return self._cache[track.id][0]
+
+    def _start(self, track):
+        task = self._inflight.get(track.id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(track))
+            self._inflight[track.id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(track.id, None))
+        return task
+
+    async def resolve(self, track):
+        """
+        Geeft een geldige StreamInfo voor de track terug en haalt hem zo nodig (opnieuw) op.
+        """
+        stream = self.get_cached(track.id)
+        if stream:
+            return stream
+        return await asyncio.shield(self._start(track))
+
+    def prefetch(self, tracks):
+        """
+        Haalt op de achtergrond de stream-URLs op van de opgegeven tracks, als die nog niet geldig bewaard zijn.
+        """
+        for track in tracks:
+            if self.get_cached(track.id):
+                continue
+            task = self._start(track)
+            task.add_done_callback(self._log_prefetch_error)
+
+    @staticmethod
+    def _log_prefetch_error(task):
+        if not task.cancelled() and task.exception():
+            logger.warning(f"[STREAM] Vooraf ophalen mislukt: {task.exception()}")
@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from urllib.parse import parse_qs, urlparse
+
+from utils.queue_manager import Track
+from utils.stream_resolver import StreamInfo
+
+logger = logging.getLogger(__name__)
+
+METADATA_TTL = 30 * 24 * 3600   # titel, duur en thumbnail veranderen zelden
+STREAM_TTL = 3 * 3600           # stream-URLs zijn hooguit een paar uur geldig
+MAX_ENTRIES = 20000             # daarboven worden de minst recent gebruikte queries verwijderd
+MAX_SPOTIFY_MAPPINGS = 100000   # Spotify-id → YouTube-video koppelingen, ook LRU
+
+YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def normalize_query(query):
+    """
+    Zet een query om naar een cache-sleutel.
+    YouTube-links naar één video worden 'yt:<video_id>', andere links blijven zoals ze zijn
+    en zoekopdrachten worden zonder hoofdletters en dubbele spaties opgeslagen.
+    """
+    query = query.strip()
+    if query.startswith(("http://", "https://")):
+        parsed = urlparse(query)
+        params = parse_qs(parsed.query)
+        video_id = None
+        if parsed.netloc.endswith("youtu.be"):
+            video_id = parsed.path.lstrip("/")
+        elif "youtube.com" in parsed.netloc and "list" not in params:
+            video_id = params.get("v", [None])[0]
+        if video_id and YOUTUBE_ID_RE.match(video_id):
+            return f"yt:{video_id}"
+        return f"url:{query}"
+    return "q:" + " ".join(query.lower().split())
+
+
+class TrackCache:
+    """
+    Persistente SQLite cache voor track-metadata per query, stream-URLs per video-id
+    en de koppeling van Spotify-nummers aan YouTube-video's.
+    Metadata heeft een lange TTL, stream-URLs een korte. Het aantal queries is begrensd
+    en bij overschrijding worden de minst recent gebruikte verwijderd (LRU).
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, metadata_ttl=METADATA_TTL, stream_ttl=STREAM_TTL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_entries = max_entries
+        self.metadata_ttl = metadata_ttl
+        self.stream_ttl = stream_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stream_hits = 0
+        self.stream_misses = 0
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS tracks_last_used ON tracks (last_used);
+            CREATE TABLE IF NOT EXISTS streams (
+                video_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                acodec TEXT
+            );
+        """)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS spotify_map (
+                spotify_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS spotify_map_last_used ON spotify_map (last_used);
+            CREATE TABLE IF NOT EXISTS loudness (
+                video_id TEXT PRIMARY KEY,
+                integrated_lufs REAL NOT NULL,
+                measured_at REAL NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(streams)")}
+        if "acodec" not in columns:
+            self._db.execute("ALTER TABLE streams ADD COLUMN acodec TEXT")
+        self._db.commit()
+
+    def get_tracks(self, query):
+        """
+        Geeft de bewaarde tracks voor een query terug, of None bij een miss of verlopen entry.
+        """
+        key = normalize_query(query)
+        now = time.time()
+        row = self._db.execute("SELECT data, expires_at FROM tracks WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < now:
+            self.misses += 1
+            return None
+        self._db.execute("UPDATE tracks SET last_used = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        self.hits += 1
+        return [Track.from_dict(data) for data in json.loads(row[0])]
+
+    def recent_tracks(self, limit=5000):
+        """
+        Geeft de meest recent gebruikte losse video's uit de cache terug (voor de autocomplete-index).
+        """
+        rows = self._db.execute(
+            "SELECT data FROM tracks WHERE key LIKE 'yt:%' AND expires_at > ? ORDER BY last_used DESC LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [Track.from_dict(data) for (row,) in rows for data in json.loads(row)]
+
+    def put_tracks(self, query, tracks):
+        """
+        Bewaart de tracks voor een query. Een enkele track wordt ook onder zijn video-id bewaard,
+        zodat een latere link naar dezelfde video direct een hit is.
+        """
+        now = time.time()
+        data = json.dumps([track.to_dict() for track in tracks])
+        rows = [(normalize_query(query), data, now + self.metadata_ttl, now)]
+        if len(tracks) == 1:
+            rows.append((f"yt:{tracks[0].id}", data, now + self.metadata_ttl, now))
+        self._db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?)", rows)
+        self._evict()
+        self._db.commit()
+
+    def get_stream(self, video_id, min_valid=0):
+        """
+        Geeft een bewaarde StreamInfo terug die nog minstens min_valid seconden geldig is.
+        """
+        row = self._db.execute(
+            "SELECT url, acodec FROM streams WHERE video_id = ? AND expires_at > ?",
+            (video_id, time.time() + min_valid),
+        ).fetchone()
+        if row is None:
+            self.stream_misses += 1
+            return None
+        self.stream_hits += 1
+        return StreamInfo(*row)
+
+    def put_stream(self, video_id, stream, expires_at):
+        expires_at = min(expires_at, time.time() + self.stream_ttl)
+        self._db.execute(
+            "INSERT OR REPLACE INTO streams (video_id, url, expires_at, acodec) VALUES (?, ?, ?, ?)",
+            (video_id, stream.url, expires_at, stream.acodec),
+        )
+        self._db.commit()
+
+    def get_spotify_tracks(self, spotify_ids):
+        """
+        Geeft voor de opgegeven Spotify-id's de eerder gekoppelde YouTube-track terug (id → Track).
+        Id's zonder koppeling ontbreken in het resultaat.
+        """
+        found = {}
+        now = time.time()
+        for spotify_id in spotify_ids:
+            row = self._db.execute("SELECT data FROM spotify_map WHERE spotify_id = ?", (spotify_id,)).fetchone()
+            if row is not None:
+                found[spotify_id] = Track.from_dict(json.loads(row[0]))
+        if found:
+            self._db.executemany(
+                "UPDATE spotify_map SET last_used = ? WHERE spotify_id = ?",
+                [(now, spotify_id) for spotify_id in found],
+            )
+            self._db.commit()
+        self.hits += len(found)
+        self.misses += len(spotify_ids) - len(found)
+        return found
+
+    def put_spotify_track(self, spotify_id, track):
+        self._db.execute(
+            "INSERT OR REPLACE INTO spotify_map VALUES (?, ?, ?)",
+            (spotify_id, json.dumps(track.to_dict()), time.time()),
+        )
+        self._db.commit()
+
+    def get_loudness(self, video_id):
+        """
+        Geeft de gemeten integrated loudness (LUFS) van een video terug, of None als die nog niet gemeten is.
+        """
+        row = self._db.execute("SELECT integrated_lufs FROM loudness WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def put_loudness(self, video_id, integrated_lufs):
+        self._db.execute(
+            "INSERT OR REPLACE INTO loudness VALUES (?, ?, ?)",
+            (video_id, integrated_lufs, time.time()),
+        )
+        self._db.commit()
+
+    def _evict(self):
+        now = time.time()
+        self._db.execute("DELETE FROM tracks WHERE expires_at < ?", (now,))
+        self._db.execute("DELETE FROM streams WHERE expires_at < ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM tracks WHERE key IN (SELECT key FROM tracks ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM spotify_map").fetchone()
+        if count > MAX_SPOTIFY_MAPPINGS:
+            self._db.execute(
+                "DELETE FROM spotify_map WHERE spotify_id IN "
+                "(SELECT spotify_id FROM spotify_map ORDER BY last_used LIMIT ?)",
+                (count - MAX_SPOTIFY_MAPPINGS,),
+            )
+
+    def stats(self):
+        """
+        Geeft de hit/miss tellers en het aantal bewaarde entries terug.
+        """
+        (entries,) = self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stream_hits": self.stream_hits,
+            "stream_misses": self.stream_misses,
+            "entries": entries,
+        }
+
+    def close(self):
+        self._db.close()
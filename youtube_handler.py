@@ -1,9 +1,15 @@
 import logging
 import asyncio
-import yt_dlp
-import aiohttp
+import itertools
 import os
 from playlist_handler import flatten_playlist
+from spotify_handler import iter_spotify_items, get_spotify_client
+from utils.extract_pool import ExtractPool, ProcessExtractPool
+from utils.stream_resolver import StreamResolver
+from utils.track_cache import TrackCache, normalize_query
+from utils.singleflight import SingleFlight
+from utils.http_client import ApiClient
+from utils.queue_manager import Track
 from urllib.parse import parse_qs, urlparse
 import re
 
@@ -12,100 +18,338 @@ logger.setLevel(logging.DEBUG)
 
 COOKIES_PATH = "cookies.txt"
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-YOUTUBE_PLAYLIST_API_URL = "https://www.googleapis.com/youtube/v3/playlistItems"
+YOUTUBE_API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+YOUTUBE_PLAYLIST_API_URL = f"{YOUTUBE_API_BASE_URL}/playlistItems"
+YOUTUBE_VIDEOS_API_URL = f"{YOUTUBE_API_BASE_URL}/videos"
+ISO8601_DURATION_RE = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
 
 print("API KEY GEVONDEN:", YOUTUBE_API_KEY)
 
-async def get_audio_info(queries):
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'quiet': True,
-        'default_search': 'ytsearch',
-        'noplaylist': False,
-        'extract_flat': False,
-        'ignoreerrors': True,
-        'source_address': '0.0.0.0',
-        'cookiefile': COOKIES_PATH
-    }
+YDL_OPTS = {
+    'format': 'bestaudio[acodec=opus]/bestaudio/best',
+    'quiet': True,
+    'default_search': 'ytsearch',
+    'noplaylist': False,
+    'extract_flat': False,
+    'ignoreerrors': True,
+    'source_address': '0.0.0.0',
+    'cookiefile': COOKIES_PATH
+}
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "4"))
+EXTRACT_BACKEND = os.getenv("EXTRACT_BACKEND", "thread")  # 'thread' of 'process'
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", "2"))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "data/cache.sqlite3")
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "data/http_cache.sqlite3")
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "5"))  # aantal resultaten van een snelle zoekopdracht
+
+# Zoeken zonder formats: alleen id, titel en duur per resultaat.
+FLAT_SEARCH_OPTS = {**YDL_OPTS, 'extract_flat': 'in_playlist'}
+
+_extract_pool = None
+_search_pool = None
+
+
+def get_extract_pool():
+    """
+    Geeft de gedeelde ExtractPool terug en maakt deze aan bij het eerste gebruik.
+    """
+    global _extract_pool
+    if _extract_pool is None:
+        pool_class = ProcessExtractPool if EXTRACT_BACKEND == "process" else ExtractPool
+        _extract_pool = pool_class(YDL_OPTS, max_workers=EXTRACT_WORKERS)
+    return _extract_pool
+
+
+def start_process_pool():
+    """
+    Start de worker-processen als EXTRACT_BACKEND 'process' is. Roep dit aan voordat er threads draaien
+    (vóór bot.run), want de workers worden geforkt.
+    """
+    if EXTRACT_BACKEND == "process":
+        get_extract_pool()
+
+
+def get_search_pool():
+    """
+    Geeft de pool voor platte zoekopdrachten terug. Die doen alleen één zoekpagina en nauwelijks
+    parsing, dus hier volstaan threads, ook als EXTRACT_BACKEND 'process' is.
+    """
+    global _search_pool
+    if _search_pool is None:
+        _search_pool = ExtractPool(FLAT_SEARCH_OPTS, max_workers=EXTRACT_WORKERS)
+    return _search_pool
+
+
+def _import_extractors():
+    import yt_dlp  # noqa: F401 — alleen laden, de workers maken hun eigen YoutubeDL
+    get_spotify_client()
+
+
+async def warm_up():
+    """
+    Laadt yt-dlp en de Spotify-client op de achtergrond na het inloggen,
+    zodat het eerste /play niet op die imports hoeft te wachten.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    get_extract_pool()
+    await asyncio.to_thread(_import_extractors)
+    logger.info(f"[YT-DLP] Extractors opgewarmd in {loop.time() - start:.2f}s")
+
+
+track_cache = TrackCache(CACHE_DB_PATH)
+api_client = ApiClient(HTTP_CACHE_PATH, daily_quota=YOUTUBE_DAILY_QUOTA)
+extraction_flight = SingleFlight()
+
+
+async def extract_result(query):
+    """
+    Extraheert één query als ExtractResult. Gelijktijdige extracties van dezelfde video of zoekopdracht
+    (zelfde genormaliseerde sleutel) worden samengevoegd tot één yt-dlp aanroep.
+    """
+    return await extraction_flight.do(normalize_query(query), lambda: get_extract_pool().extract_result(query))
+
+
+async def extract_info(query):
+    res = await extract_result(query)
+    if res.error is not None:
+        raise res.error
+    return res.info
+
+
+stream_resolver = StreamResolver(extract_info, cache=track_cache)
+
+
+async def resolve_stream_url(track):
+    """
+    Geeft de directe stream (StreamInfo met url en acodec) van een track uit de wachtrij terug,
+    net voordat hij afgespeeld wordt.
+    """
+    return await stream_resolver.resolve(track)
+
+
+def prefetch_stream_urls(tracks):
+    """
+    Bereidt de stream-URLs van de eerstvolgende PREFETCH_COUNT tracks op de achtergrond voor.
+    """
+    stream_resolver.prefetch(itertools.islice(tracks, PREFETCH_COUNT))
+
+
+def info_to_tracks(info):
+    """
+    Zet een yt-dlp info dict (enkele video of playlist) om naar een lijst van tracks.
+    De wachtrij bewaart alleen metadata; een eventueel meegekomen stream-URL gaat naar de StreamResolver.
+    """
+    if 'entries' in info and isinstance(info['entries'], list):
+        entries = flatten_playlist(info['entries'])
+    else:
+        entries = [info]
+
+    tracks = []
+    for entry in entries:
+        if not entry or not entry.get("id"):
+            continue
+        if entry.get("format_id") and entry.get("url"):
+            stream_resolver.store(entry['id'], entry['url'], entry.get('acodec'))
+        tracks.append(Track.from_dict(entry))
+    return tracks
+
+
+async def extract_tracks(queries):
+    """
+    Extraheert alle queries parallel en geeft per query een (query, tracks, error) tuple terug,
+    in dezelfde volgorde als de queries. Queries die al in de TrackCache staan worden niet opnieuw geëxtraheerd.
+    """
+    cached = {q: track_cache.get_tracks(q) for q in queries}
+    misses = [q for q in dict.fromkeys(queries) if cached[q] is None]
+    # stats() kost een COUNT-query op de cache; alleen uitrekenen als debug-logging aan staat.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[CACHE] {len(queries) - len(misses)} hits, {len(misses)} misses ({track_cache.stats()})")
+
+    extracted = {}
+    results = await asyncio.gather(*(extract_result(q) for q in misses))
+    for q, res in zip(misses, results):
+        if res.error is not None:
+            logger.warning(f"[YT-DLP] Fout bij verwerken van query '{q}': {res.error.__class__.__name__} - {res.error}")
+            extracted[q] = ([], res.error)
+            continue
+        tracks = info_to_tracks(res.info)
+        if tracks:
+            track_cache.put_tracks(q, tracks)
+        extracted[q] = (tracks, None)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[SINGLE-FLIGHT] {extraction_flight.stats()}")
 
     results = []
-    loop = asyncio.get_event_loop()
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        for q in queries:
-            try:
-                info = await loop.run_in_executor(None, lambda: ydl.extract_info(q, download=False))
-                if info is None:
-                    logger.warning(f"[YT-DLP] Geen info gevonden voor: {q}")
-                    continue
-
-                entries = []
-                if 'entries' in info and isinstance(info['entries'], list):
-                    entries = flatten_playlist(info['entries'])
-                else:
-                    entries = [info]
-
-                for entry in entries:
-                    if not entry or not entry.get("url"):
-                        continue
-                    results.append({
-                        'title': entry.get('title', 'Onbekend'),
-                        'url': entry.get('url') or f"https://www.youtube.com/watch?v={entry.get('id')}",
-                        'webpage_url': entry.get('webpage_url'),
-                        'duration': entry.get('duration', 0),
-                        'thumbnail': entry.get('thumbnail'),
-                    })
-
-            except Exception as e:
-                logger.warning(f"[YT-DLP] Fout bij verwerken van query '{q}': {e.__class__.__name__} - {e}")
+    for q in queries:
+        if cached[q] is not None:
+            results.append((q, cached[q], None))
+        else:
+            results.append((q, *extracted[q]))
+    return results
 
+
+async def get_audio_info(queries):
+    results = []
+    for _, tracks, _ in await extract_tracks(queries):
+        results.extend(tracks)
     return results
 
-async def get_playlist_video_urls(playlist_id: str, max_results: int = 500):
+
+def flat_entry_to_track(entry):
+    """
+    Zet een resultaat van een platte zoekopdracht om naar een track met alleen metadata.
+    """
+    video_id = entry['id']
+    return Track(
+        id=video_id,
+        title=entry.get('title') or "Onbekend",
+        webpage_url=f"https://www.youtube.com/watch?v={video_id}",
+        duration=int(entry.get('duration') or 0),
+        thumbnail=f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+    )
+
+
+async def search_tracks(query, limit=SEARCH_RESULTS):
+    """
+    Snelle zoekopdracht: een platte ytsearchN die alleen id's, titels en duur ophaalt.
+    Formats en de stream-URL worden pas bepaald als het gekozen nummer gaat spelen (StreamResolver).
+    """
+    search = f"ytsearch{limit}:{query}"
+    cached = track_cache.get_tracks(search)
+    if cached is not None:
+        return cached
+
+    res = await extraction_flight.do(normalize_query(search), lambda: get_search_pool().extract_result(search))
+    if res.error is not None or not res.info:
+        logger.warning(f"[YT-DLP] Zoeken naar '{query}' mislukt: {res.error}")
+        return []
+    tracks = [flat_entry_to_track(entry) for entry in res.info.get('entries') or [] if entry and entry.get('id')]
+    if tracks:
+        track_cache.put_tracks(search, tracks)
+    return tracks
+
+
+def remember_track(track):
+    """
+    Bewaart een gekozen zoekresultaat onder zijn video-id, zodat een latere link of suggestie direct een hit is.
+    """
+    track_cache.put_tracks(track.webpage_url, [track])
+
+def parse_iso8601_duration(value):
+    """
+    Zet een ISO-8601 duur van de YouTube API (bijv. 'PT1H2M3S') om naar seconden.
+    """
+    match = ISO8601_DURATION_RE.match(value or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def video_to_track(item):
+    """
+    Zet een item uit de videos.list response om naar een track met alleen metadata.
+    """
+    snippet = item.get('snippet', {})
+    thumbnails = snippet.get('thumbnails', {})
+    thumbnail = next((thumbnails[size]['url'] for size in ('high', 'medium', 'default') if size in thumbnails), None)
+    return Track(
+        id=item['id'],
+        title=snippet.get('title', 'Onbekend'),
+        duration=parse_iso8601_duration(item.get('contentDetails', {}).get('duration')),
+        thumbnail=thumbnail,
+    )
+
+
+async def _api_get(url, params):
+    url_debug = f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items() if k != 'key')}"
+    logger.debug(f"[YOUTUBE API] API-aanroep: {url_debug}")
+    # playlistItems.list en videos.list kosten allebei 1 quota-eenheid.
+    return await api_client.get_json(url, params, cost=1)
+
+
+async def _iter_playlist_video_ids(playlist_id, max_results):
+    """
+    Async generator die per playlistItems-pagina (max. 50) een lijst van video-id's oplevert.
+    """
+    count = 0
+    next_page_token = None
+
+    while True:
+        params = {
+            'part': 'snippet',
+            'playlistId': playlist_id,
+            'maxResults': min(50, max_results - count),
+            'key': YOUTUBE_API_KEY
+        }
+        if next_page_token:
+            params['pageToken'] = next_page_token
+
+        data = await _api_get(YOUTUBE_PLAYLIST_API_URL, params)
+        if data is None:
+            return
+
+        video_ids = []
+        for item in data.get('items', []):
+            video_id = item['snippet'].get('resourceId', {}).get('videoId')
+            if video_id:
+                video_ids.append(video_id)
+            if count + len(video_ids) >= max_results:
+                break
+        count += len(video_ids)
+        if video_ids:
+            yield video_ids
+
+        next_page_token = data.get('nextPageToken')
+        if not next_page_token or count >= max_results:
+            return
+
+
+def _check_playlist_api(playlist_id):
     if not YOUTUBE_API_KEY:
         logger.warning("[YOUTUBE API] Geen API-key gevonden in .env bestand.")
-        return []
+        return False
 
     if playlist_id.startswith("RD"):
         logger.warning("[YOUTUBE API] RD-playlist gedetecteerd. Alleen eerste video gebruiken.")
-        return []
+        return False
+    return True
 
-    async with aiohttp.ClientSession() as session:
-        urls = []
-        next_page_token = None
 
-        while True:
+async def iter_playlist_metadata(playlist_id: str, max_results: int = 500):
+    """
+    Async generator die per pagina van 50 video's de tracks met metadata oplevert.
+    Titel, duur en thumbnail komen uit één videos.list aanroep per pagina, zodat yt-dlp
+    pas nodig is wanneer een nummer afgespeeld wordt. Verwijderde of privé video's vallen weg.
+    """
+    if not _check_playlist_api(playlist_id):
+        return
+
+    quota_before = api_client.quota_used()
+    try:
+        async for video_ids in _iter_playlist_video_ids(playlist_id, max_results):
             params = {
-                'part': 'snippet',
-                'playlistId': playlist_id,
-                'maxResults': min(50, max_results - len(urls)),
+                'part': 'snippet,contentDetails',
+                'id': ','.join(video_ids),
+                'maxResults': len(video_ids),
                 'key': YOUTUBE_API_KEY
             }
-            if next_page_token:
-                params['pageToken'] = next_page_token
-
-            url_debug = f"{YOUTUBE_PLAYLIST_API_URL}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
-            logger.debug(f"[YOUTUBE API] API-aanroep: {url_debug}")
+            data = await _api_get(YOUTUBE_VIDEOS_API_URL, params)
+            if data is None:
+                return
+            items = {item['id']: item for item in data.get('items', [])}
+            tracks = [video_to_track(items[video_id]) for video_id in video_ids if video_id in items]
+            if tracks:
+                yield tracks
+    finally:
+        used = api_client.quota_used()
+        logger.info(
+            f"[YOUTUBE API] Import van playlist {playlist_id} kostte {used - quota_before} quota-eenheden "
+            f"(vandaag {used}/{api_client.daily_quota}, {api_client.not_modified} keer 304 sinds start)."
+        )
 
-            async with session.get(YOUTUBE_PLAYLIST_API_URL, params=params) as resp:
-                if resp.status != 200:
-                    body = await resp.text()
-                    logger.warning(f"[YOUTUBE API] Mislukte API-call: {resp.status} | Body: {body}")
-                    break
-
-                data = await resp.json()
-                for item in data.get('items', []):
-                    video_id = item['snippet'].get('resourceId', {}).get('videoId')
-                    if video_id:
-                        urls.append(f"https://www.youtube.com/watch?v={video_id}")
-                    if len(urls) >= max_results:
-                        break
-
-                next_page_token = data.get('nextPageToken')
-                if not next_page_token or len(urls) >= max_results:
-                    break
-
-    return urls
 
 async def extract_playlist_id(playlist_url: str):
     parsed = urlparse(playlist_url)
@@ -119,33 +363,77 @@ async def extract_playlist_id(playlist_url: str):
 
     return playlist_id
 
-async def get_audio_info_fast(playlist_url):
+async def iter_playlist_tracks(playlist_url):
+    """
+    Async generator die de tracks van een playlist in batches oplevert zodra ze opgehaald zijn.
+    De eerste batch bevat alleen het eerste nummer, zodat het afspelen direct kan beginnen.
+    Met een API-key komt alleen metadata uit de YouTube Data API; zonder valt het terug op yt-dlp.
+    """
     playlist_id = await extract_playlist_id(playlist_url)
 
     if not playlist_id:
         logger.warning("[YOUTUBE API] Kan playlist-ID niet vinden in URL")
-        return [], []
+        return
 
-    if playlist_id.startswith("RD"):
-        logger.warning("[YOUTUBE API] RD-playlist gedetecteerd. Alleen eerste video ophalen.")
-        single_result = await get_audio_info([playlist_url])
-        if not single_result:
-            return [], []
-        return single_result[:1], []
-
-    urls = await get_playlist_video_urls(playlist_id)
-
-    if not urls:
-        logger.debug("[YOUTUBE API] Geen URLs via API. Fallback naar yt-dlp enkele video extractie.")
-        single_result = await get_audio_info([playlist_url])
-        if not single_result:
-            return [], []
-        return single_result[:1], []
-
-    results = await get_audio_info(urls)
-    if not results:
-        return [], []
-
-    first = results[:1]
-    rest = results[1:]
-    return first, rest
\ No newline at end of file
+    found = False
+    async for tracks in iter_playlist_metadata(playlist_id):
+        if not found:
+            found = True
+            yield tracks[:1]
+            tracks = tracks[1:]
+        if tracks:
+            yield tracks
+    if found:
+        return
+
+    logger.debug("[YOUTUBE API] Geen tracks via API. Fallback naar yt-dlp enkele video extractie.")
+    single_result = await get_audio_info([playlist_url])
+    if single_result:
+        yield single_result[:1]
+
+
+SPOTIFY_BATCH_SIZE = 25
+
+
+async def _resolve_spotify_items(items):
+    """
+    Koppelt (spotify_id, 'Artiest - Titel') tuples aan YouTube-tracks, in volgorde.
+    Eerder gekoppelde nummers komen uit de cache; de rest wordt gelijktijdig gezocht.
+    """
+    known = track_cache.get_spotify_tracks([spotify_id for spotify_id, _ in items if spotify_id])
+    searches = [query for spotify_id, query in items if spotify_id not in known]
+    found = {}
+    for query, tracks, _ in await extract_tracks(searches):
+        if tracks:
+            found[query] = tracks[0]
+
+    resolved = []
+    for spotify_id, query in items:
+        track = known.get(spotify_id)
+        if track is None:
+            track = found.get(query)
+            if track is None:
+                continue
+            if spotify_id:
+                track_cache.put_spotify_track(spotify_id, track)
+        resolved.append(track)
+    return resolved
+
+
+async def iter_spotify_tracks(url):
+    """
+    Async generator die de nummers van een Spotify-track, -playlist of -album als YouTube-tracks oplevert.
+    Het eerste nummer komt los, zodat het afspelen direct kan starten; de rest volgt in batches.
+    """
+    first = True
+    async for items in iter_spotify_items(url):
+        if first and items:
+            first = False
+            tracks = await _resolve_spotify_items(items[:1])
+            if tracks:
+                yield tracks
+            items = items[1:]
+        for i in range(0, len(items), SPOTIFY_BATCH_SIZE):
+            tracks = await _resolve_spotify_items(items[i:i + SPOTIFY_BATCH_SIZE])
+            if tracks:
+                yield tracks